@@ -0,0 +1,94 @@
+"""
+Compares micro-batched NudeNet inference against one-by-one scans under
+bursts of concurrent uploads: throughput and p50/p99 latency per scan.
+
+    python benchmarks/moderation_batching.py [--images DIR] [--burst N] [--rounds N]
+
+Without --images, random 640x480 frames are used.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from moderation_engine import DetectorPool  # noqa: E402
+from sample_images import percentile, read_images  # noqa: E402
+
+
+def load_images(directory: str | None, count: int) -> list:
+    if directory:
+        return read_images(directory, count)
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+
+async def _timed_scan(pool: DetectorPool, image, latencies: list[float]):
+    started = time.perf_counter()
+    await pool.scan(image)
+    latencies.append(time.perf_counter() - started)
+
+
+async def run(images: list, workers: int, max_batch: int, max_wait_ms: int, rounds: int) -> dict:
+    pool = DetectorPool(
+        workers=workers,
+        queue_size=len(images) * 2,
+        timeout=120,
+        max_batch=max_batch,
+        max_wait_ms=max_wait_ms,
+    )
+
+    # Load every worker's detector, then run the batched path once before timing
+    await pool.warm_up()
+    await asyncio.gather(*(pool.scan(images[0]) for _ in range(workers * max_batch)))
+
+    latencies: list[float] = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(_timed_scan(pool, image, latencies) for image in images))
+    elapsed = time.perf_counter() - started
+
+    pool.close()
+    return {
+        "images_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", help="Directory of sample images")
+    parser.add_argument("--burst", type=int, default=16, help="Concurrent uploads per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--wait-ms", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images, args.burst)
+    if not images:
+        parser.error("no images found")
+
+    modes = {
+        "per-image": (1, 0),
+        f"batched x{args.batch}": (args.batch, args.wait_ms),
+    }
+
+    for name, (max_batch, max_wait_ms) in modes.items():
+        result = asyncio.run(run(images, args.workers, max_batch, max_wait_ms, args.rounds))
+        print(
+            f"{name:>12}: {result['images_per_second']:.1f} img/s  "
+            f"p50 {result['p50_ms']:.0f} ms  p99 {result['p99_ms']:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Regression check and micro-benchmark for the thumbnail nature scorer.
+
+Scores every image with both the legacy full-frame scorer and the
+thumbnail scorer, then reports routing agreement at the threshold, score
+drift and images per second for each. Exits with status 1 when routing
+agreement or the largest score difference falls outside tolerance.
+
+    python benchmarks/nature_scoring.py [--images DIR] [--threshold 0.75] [--max-delta 0.1]
+
+Without --images, synthetic 2600x2000 landscapes, indoor shots and mixed
+scenes are generated, along with 4000x3000 photo-like scenes: smooth,
+slightly blurred backgrounds with sharp-edged objects, where edge density
+depends most on resolution.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_pipeline import decode_image  # noqa: E402
+from nature_scoring import legacy_nature_score, score_image  # noqa: E402
+from sample_images import read_images  # noqa: E402
+
+
+def _texture(rng, h: int, w: int) -> np.ndarray:
+    # Multi-scale noise in [-1, 1], like foliage or fabric
+    out = np.zeros((h, w), dtype=np.float32)
+    for scale in (4, 16, 64, 256):
+        small = rng.standard_normal((max(2, h * scale // 1000), max(2, w * scale // 1000)))
+        out += cv2.resize(small.astype(np.float32), (w, h), interpolation=cv2.INTER_CUBIC) / scale ** 0.3
+    return out / np.abs(out).max()
+
+
+def synthetic_scene(rng, h: int = 2000, w: int = 2600) -> bytes:
+    hsv = np.zeros((h, w, 3), dtype=np.float32)
+    noise = _texture(rng, h, w)
+    horizon = int(h * rng.uniform(0.2, 0.7))
+    kind = rng.integers(0, 3)
+
+    if kind == 0:
+        # Sky over vegetation
+        hsv[:horizon] = (rng.uniform(95, 120), rng.uniform(20, 150), rng.uniform(120, 250))
+        ground = noise[horizon:]
+        hsv[horizon:, :, 0] = rng.uniform(25, 80) + 10 * ground
+        hsv[horizon:, :, 1] = rng.uniform(30, 200) + 60 * ground
+        hsv[horizon:, :, 2] = rng.uniform(40, 200) + 80 * ground
+    elif kind == 1:
+        # Warm indoor tones with furniture-like blocks
+        hsv[..., 0] = rng.uniform(0, 30) + 5 * noise
+        hsv[..., 1] = rng.uniform(10, 120) + 30 * noise
+        hsv[..., 2] = rng.uniform(60, 230) + 40 * noise
+        for _ in range(rng.integers(2, 10)):
+            y, x = rng.integers(0, h - 200), rng.integers(0, w - 200)
+            bh, bw = rng.integers(100, 800, 2)
+            hsv[y:y + bh, x:x + bw, 2] = rng.uniform(0, 255)
+    else:
+        # Anything goes
+        hsv[..., 0] = rng.uniform(0, 179) + 30 * noise
+        hsv[..., 1] = rng.uniform(0, 255) + 60 * noise
+        hsv[..., 2] = rng.uniform(30, 255) + 90 * noise
+
+    hsv[..., 0] = np.mod(hsv[..., 0], 180)
+    bgr = cv2.cvtColor(np.clip(hsv, 0, 255).astype(np.uint8), cv2.COLOR_HSV2BGR)
+    return cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def photo_scene(rng, h: int = 3000, w: int = 4000) -> bytes:
+    # Soft colour field (sky, grass, out-of-focus background)
+    field = cv2.resize(rng.uniform(-1, 1, (6, 8, 3)).astype(np.float32), (w, h), interpolation=cv2.INTER_CUBIC)
+    hsv = np.empty((h, w, 3), dtype=np.float32)
+    hsv[..., 0] = np.mod(rng.uniform(20, 130) + 15 * field[..., 0], 180)
+    hsv[..., 1] = rng.uniform(40, 200) + 30 * field[..., 1]
+    hsv[..., 2] = rng.uniform(60, 220) + 30 * field[..., 2]
+    bgr = cv2.cvtColor(np.clip(hsv, 0, 255).astype(np.uint8), cv2.COLOR_HSV2BGR)
+
+    # Sharp-edged objects in front of it
+    for _ in range(rng.integers(3, 40)):
+        colour = tuple(int(c) for c in rng.integers(0, 256, 3))
+        if rng.random() < 0.5:
+            points = rng.integers(0, (w, h), (rng.integers(3, 7), 2)).astype(np.int32)
+            cv2.fillPoly(bgr, [points], colour, lineType=cv2.LINE_AA)
+        else:
+            center = tuple(int(v) for v in rng.integers(0, (w, h)))
+            axes = tuple(int(v) for v in rng.integers(20, 900, 2))
+            cv2.ellipse(bgr, center, axes, float(rng.uniform(0, 180)), 0, 360, colour, -1, cv2.LINE_AA)
+
+    bgr = cv2.GaussianBlur(bgr, (0, 0), rng.uniform(0.8, 3.0))
+    bgr = np.clip(bgr + rng.normal(0, 2, bgr.shape), 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def load_images(directory: str | None, count: int) -> list[bytes]:
+    if directory:
+        return read_images(directory)
+
+    rng = np.random.default_rng(0)
+    return [photo_scene(rng) if i % 2 else synthetic_scene(rng) for i in range(count)]
+
+
+def timed(scorer, images: list[bytes]) -> tuple[list[float], float]:
+    started = time.perf_counter()
+    scores = [scorer(data) for data in images]
+    return scores, len(images) / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", help="Directory of sample images")
+    parser.add_argument("--count", type=int, default=40, help="Synthetic images without --images")
+    parser.add_argument("--threshold", type=float, default=0.75, help="NATURE_THRESHOLD")
+    parser.add_argument("--max-delta", type=float, default=0.1, help="Largest allowed score difference")
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="Required routing agreement")
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images, args.count)
+    if not images:
+        parser.error("no images found")
+
+    # Legacy path: full-resolution decode, full-frame scoring
+    legacy, legacy_rate = timed(lambda data: legacy_nature_score(decode_image(data)), images)
+    current, current_rate = timed(score_image, images)
+
+    deltas = [abs(a - b) for a, b in zip(legacy, current)]
+    agreement = sum(
+        (a >= args.threshold) == (b >= args.threshold) for a, b in zip(legacy, current)
+    ) / len(images)
+    routed = sum(score >= args.threshold for score in legacy)
+
+    print(f"{len(images)} images, {routed} above {args.threshold} with the legacy scorer")
+    print(f"   legacy: {legacy_rate:6.1f} img/s")
+    print(f"thumbnail: {current_rate:6.1f} img/s  ({current_rate / legacy_rate:.1f}x)")
+    print(f"routing agreement {agreement:.1%}  mean |Δ| {statistics.mean(deltas):.3f}  max |Δ| {max(deltas):.3f}")
+
+    if agreement < args.min_agreement or max(deltas) > args.max_delta:
+        print("❌ Thumbnail scorer is outside tolerance")
+        sys.exit(1)
+    print("✅ Thumbnail scorer is within tolerance")
+
+
+if __name__ == "__main__":
+    main()
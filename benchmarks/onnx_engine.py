@@ -0,0 +1,101 @@
+"""
+Compares NudeNet's stock ONNX Runtime session with tuned engine settings
+and the int8-quantized model: latency, throughput and verdict agreement
+with the stock fp32 model.
+
+    python benchmarks/onnx_engine.py [--images DIR] [--threads N] [--threshold 0.3]
+
+Without --images, random 640x480 frames are used (verdicts are then all
+negative, so agreement only means something on a real image set).
+The int8 run needs the `onnx` package to build the quantized model.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_pipeline import decode_image  # noqa: E402
+from moderation_engine import build_detector  # noqa: E402
+from sample_images import percentile, read_images  # noqa: E402
+
+
+def load_frames(directory: str | None, count: int) -> list[np.ndarray]:
+    if directory:
+        frames = [decode_image(data, 640) for data in read_images(directory)]
+        return [frame for frame in frames if frame is not None]
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def top_score(detections: list[dict]) -> float:
+    return max((item.get("score", 0) for item in detections), default=0.0)
+
+
+def run(detector, frames: list[np.ndarray]) -> tuple[list[float], list[float], float]:
+    detector.detect(frames[0])  # warm-up
+
+    latencies = []
+    scores = []
+    started = time.perf_counter()
+    for frame in frames:
+        t = time.perf_counter()
+        scores.append(top_score(detector.detect(frame)))
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+
+    return scores, latencies, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", help="Directory of sample images")
+    parser.add_argument("--count", type=int, default=50, help="Synthetic frames without --images")
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads for the tuned runs")
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--skip-int8", action="store_true")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.images, args.count)
+    if not frames:
+        parser.error("no images found")
+
+    from nudenet import NudeDetector
+
+    tuned = {"intra_op_threads": args.threads, "inter_op_threads": 1}
+    engines = {
+        "stock fp32": NudeDetector(),
+        "tuned fp32": build_detector(tuned),
+    }
+    if not args.skip_int8:
+        engines["tuned int8"] = build_detector({**tuned, "quantized": True})
+
+    baseline = None
+    print(f"{len(frames)} images, threshold {args.threshold}")
+
+    for name, detector in engines.items():
+        scores, latencies, elapsed = run(detector, frames)
+        verdicts = [score >= args.threshold for score in scores]
+
+        if baseline is None:
+            baseline = (scores, verdicts)
+
+        agreement = sum(a == b for a, b in zip(verdicts, baseline[1])) / len(verdicts)
+        drift = statistics.mean(abs(a - b) for a, b in zip(scores, baseline[0]))
+
+        print(
+            f"{name:>11}: {len(frames) / elapsed:6.1f} img/s  "
+            f"p50 {statistics.median(latencies) * 1000:5.1f} ms  "
+            f"p99 {percentile(latencies, 99) * 1000:5.1f} ms  "
+            f"agreement {agreement:.1%}  mean |Δscore| {drift:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmarks the storage calls made by the on_message paths against each
+backend, side by side.
+
+    python benchmarks/storage_backends.py [--messages N] [--users N]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from storage import MemoryStorage, SQLiteStorage  # noqa: E402
+
+CHANNEL_ID = 1
+LOG_DATE = "2025-01-01"
+
+
+async def _daily_image_path(storage, user_id: int):
+    # DailyImageChannel.on_message
+    if not await storage.has_posted_today(user_id, CHANNEL_ID):
+        await storage.record_post(user_id, CHANNEL_ID)
+
+
+async def _personal_update_path(storage, user_id: int, message_id: int):
+    # DailyPersonalUpdates.on_message
+    if not await storage.has_personal_update_today(user_id, CHANNEL_ID, LOG_DATE):
+        await storage.insert_personal_update(
+            user_id, CHANNEL_ID, message_id, LOG_DATE, "Benchmark entry", LOG_DATE
+        )
+
+
+async def run(storage, messages: int, users: int) -> dict:
+    await storage.setup()
+    started = time.perf_counter()
+
+    await asyncio.gather(*(
+        _daily_image_path(storage, i % users) for i in range(messages)
+    ))
+    await asyncio.gather(*(
+        _personal_update_path(storage, i % users, i) for i in range(messages)
+    ))
+    await asyncio.gather(*(
+        storage.get_personal_updates_page(i % users, limit=5) for i in range(messages)
+    ))
+
+    elapsed = time.perf_counter() - started
+    await storage.close()
+
+    return {"seconds": elapsed, "messages_per_second": 3 * messages / elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": MemoryStorage(),
+            "sqlite": SQLiteStorage(Path(tmp) / "bench.db"),
+        }
+
+        for name, storage in backends.items():
+            result = asyncio.run(run(storage, args.messages, args.users))
+            print(
+                f"{name:>7}: {result['seconds']:.3f}s "
+                f"({result['messages_per_second']:.0f} calls/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
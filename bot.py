@@ -1,9 +1,13 @@
 import os
+import time
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from database import setup_database
+from http_client import HttpClient
+from storage import Storage, create_storage
+
+STARTED_AT = time.perf_counter()
 
 # =========================
 # Environment
@@ -14,6 +18,9 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 if not TOKEN or not TOKEN.strip():
     raise ValueError("DISCORD_TOKEN environment variable is not set or empty.")
 
+# "sqlite" (default) or "memory" (no disk I/O, for load tests)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+
 # =========================
 # Intents
 # =========================
@@ -25,9 +32,26 @@ intents.reactions = True
 # =========================
 # Bot
 # =========================
-bot = commands.Bot(
+class Bot(commands.Bot):
+    def __init__(self, *args, storage: Storage, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = storage
+
+        # Shared media downloads (bot.http is discord.py's own API client)
+        self.http_client = HttpClient()
+
+    async def close(self):
+        await super().close()
+        await self.http_client.close()
+
+        # Drain pending writes before the loop goes away
+        await self.storage.close()
+
+
+bot = Bot(
     command_prefix="!",
-    intents=intents
+    intents=intents,
+    storage=create_storage(STORAGE_BACKEND)
 )
 
 # =========================
@@ -44,8 +68,11 @@ async def load_cogs():
 # =========================
 @bot.event
 async def setup_hook():
-    # Initialize database
-    setup_database()
+    # Initialize storage (off the event loop)
+    await bot.storage.setup()
+
+    # Open the shared HTTP connection pool
+    await bot.http_client.start()
 
     # Load cogs
     await load_cogs()
@@ -63,6 +90,7 @@ async def setup_hook():
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
+    print(f"Gateway ready {time.perf_counter() - STARTED_AT:.2f}s after start")
     print("------")
 
 # =========================
@@ -4,21 +4,15 @@ import discord
 from discord.ext import commands
 
 from config import DAILY_IMAGE_CHANNELS
-from database import (
-    has_posted_today,
-    record_post,
-    cleanup_old_daily_posts
-)
 
 
 class DailyImageChannel(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.storage = bot.storage
 
     @commands.Cog.listener()
     async def on_ready(self):
-        cleanup_old_daily_posts()
-
         for channel_id in DAILY_IMAGE_CHANNELS:
             channel = self.bot.get_channel(channel_id)
             if not channel:
@@ -61,15 +55,17 @@ class DailyImageChannel(commands.Cog):
         if not message.attachments:
             return
 
-        if has_posted_today(message.author.id, message.channel.id):
+        # Fast check (DB), then claim today's slot. The claim fails if a
+        # concurrent message from the same user got there first.
+        if (
+            await self.storage.has_posted_today(message.author.id, message.channel.id)
+            or not await self.storage.record_post(message.author.id, message.channel.id)
+        ):
             await message.delete()
             await message.channel.send(
                 f"{message.author.mention} you already posted an image today.",
                 delete_after=10
             )
-            return
-
-        record_post(message.author.id, message.channel.id)
 
 
 async def setup(bot: commands.Bot):
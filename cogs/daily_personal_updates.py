@@ -1,26 +1,197 @@
 import discord
 from discord.ext import commands
-from discord import app_commands
+from discord import app_commands, ui
 from datetime import datetime, timezone
+import os
 import re
+import tempfile
+from collections import OrderedDict
+from typing import Literal
 
 from config import CHANNEL_DAILY_UPDATES, MODERATOR_ROLE_ID
-from database import (
-    has_personal_update_today,
-    insert_personal_update,
-    get_personal_updates,
-    get_personal_update_by_date,
-    get_user_updates_for_mod_view
-)
+from logbook_export import export_filename
+from storage import Storage
 
 
 DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+SEARCH_PAGE_SIZE = 5
+PAGE_CACHE_SIZE = 256
 
 
 def _is_moderator(member: discord.Member) -> bool:
     return any(role.id == MODERATOR_ROLE_ID for role in getattr(member, "roles", []))
 
 
+async def _search_page(storage: Storage, user_id: int, query: str, after: tuple[float, int] | None):
+    """
+    Returns (rows, next_cursor). next_cursor is None on the last page.
+    """
+    rows = await storage.search_personal_updates(
+        user_id, query, limit=SEARCH_PAGE_SIZE + 1, after=after
+    )
+
+    if len(rows) <= SEARCH_PAGE_SIZE:
+        return rows, None
+
+    rows = rows[:SEARCH_PAGE_SIZE]
+    return rows, (rows[-1]["rank"], rows[-1]["id"])
+
+
+def _search_embed(title: str, query: str, rows, color: discord.Color, page: int) -> discord.Embed:
+    embed = discord.Embed(
+        title=title,
+        description=f"Results for **{discord.utils.escape_markdown(query)}**",
+        color=color
+    )
+
+    for row in rows:
+        embed.add_field(name=row["log_date"], value=row["snippet"][:1024], inline=False)
+
+    embed.set_footer(text=f"Page {page}")
+    return embed
+
+
+# ----------------------------
+# "More results" button for logbook search (keyset pagination)
+# ----------------------------
+class LogSearchView(ui.View):
+    def __init__(
+        self,
+        storage: Storage,
+        viewer_id: int,
+        user_id: int,
+        query: str,
+        title: str,
+        color: discord.Color,
+        cursor: tuple[float, int],
+    ):
+        super().__init__(timeout=300)
+        self.storage = storage
+        self.viewer_id = viewer_id
+        self.user_id = user_id
+        self.query = query
+        self.title = title
+        self.color = color
+        self.cursor = cursor
+        self.page = 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.viewer_id:
+            return True
+
+        await interaction.response.send_message(
+            "These search results belong to someone else.",
+            ephemeral=True
+        )
+        return False
+
+    @ui.button(label="More results ▶", style=discord.ButtonStyle.secondary)
+    async def more(self, interaction: discord.Interaction, button: ui.Button):
+        rows, self.cursor = await _search_page(self.storage, self.user_id, self.query, self.cursor)
+        self.page += 1
+
+        if self.cursor is None:
+            button.disabled = True
+            self.stop()
+
+        await interaction.response.edit_message(
+            embed=_search_embed(self.title, self.query, rows, self.color, self.page),
+            view=self
+        )
+
+
+# ----------------------------
+# Rendered logbook pages (LRU, invalidated per user on new entries)
+# ----------------------------
+class LogbookPageCache:
+    def __init__(self, maxsize: int = PAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._pages: OrderedDict[tuple, tuple[discord.Embed, tuple[str, int] | None]] = OrderedDict()
+
+    def get(self, key: tuple):
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+        return page
+
+    def put(self, key: tuple, page: tuple[discord.Embed, tuple[str, int] | None]):
+        self._pages[key] = page
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.maxsize:
+            self._pages.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        for key in [key for key in self._pages if key[0] == user_id]:
+            del self._pages[key]
+
+
+# ----------------------------
+# Prev/next buttons for /mylog and /userlog (keyset pagination)
+# ----------------------------
+class LogbookPageView(ui.View):
+    def __init__(
+        self,
+        cog: "DailyPersonalUpdates",
+        viewer_id: int,
+        user_id: int,
+        title: str,
+        color: discord.Color,
+        page_size: int,
+        next_cursor: tuple[str, int],
+    ):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.viewer_id = viewer_id
+        self.user_id = user_id
+        self.title = title
+        self.color = color
+        self.page_size = page_size
+
+        # cursors[i] is the cursor page i was fetched with (None = newest)
+        self.cursors: list[tuple[str, int] | None] = [None]
+        self.next_cursor = next_cursor
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.prev_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = self.next_cursor is None
+
+    async def _show(self, interaction: discord.Interaction):
+        embed, self.next_cursor = await self.cog._get_log_page(
+            self.user_id, self.title, self.color, self.page_size,
+            self.cursors[-1], page=len(self.cursors)
+        )
+
+        if embed is None:
+            await interaction.response.edit_message(
+                content="No logbook entries found.", embed=None, view=None
+            )
+            return
+
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.viewer_id:
+            return True
+
+        await interaction.response.send_message(
+            "This logbook view belongs to someone else.",
+            ephemeral=True
+        )
+        return False
+
+    @ui.button(label="◀ Newer", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: ui.Button):
+        self.cursors.pop()
+        await self._show(interaction)
+
+    @ui.button(label="Older ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        self.cursors.append(self.next_cursor)
+        await self._show(interaction)
+
+
 class DailyPersonalUpdates(commands.Cog):
     """
     One-message-per-day personal update channel + database-backed personal logbook.
@@ -28,6 +199,8 @@ class DailyPersonalUpdates(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.storage = bot.storage
+        self.page_cache = LogbookPageCache()
 
     # ----------------------------
     # Listener: enforce 1 per day + save to logbook
@@ -52,7 +225,7 @@ class DailyPersonalUpdates(commands.Cog):
             content = "[No text provided]"
 
         # Fast check (DB)
-        if has_personal_update_today(message.author.id, message.channel.id, today):
+        if await self.storage.has_personal_update_today(message.author.id, message.channel.id, today):
             try:
                 await message.delete()
             except discord.Forbidden:
@@ -67,7 +240,7 @@ class DailyPersonalUpdates(commands.Cog):
                 pass
             return
 
-        inserted = insert_personal_update(
+        inserted = await self.storage.insert_personal_update(
             user_id=message.author.id,
             channel_id=message.channel.id,
             message_id=message.id,
@@ -76,6 +249,9 @@ class DailyPersonalUpdates(commands.Cog):
             created_at=created_at
         )
 
+        if inserted:
+            self.page_cache.invalidate(message.author.id)
+
         # In the rare case of a race condition (double post at the same time)
         if not inserted:
             try:
@@ -92,34 +268,86 @@ class DailyPersonalUpdates(commands.Cog):
                 pass
 
     # ----------------------------
-    # Slash command: /mylog
+    # Logbook pages
     # ----------------------------
-    @app_commands.command(name="mylog", description="Read your personal logbook entries.")
-    @app_commands.describe(limit="How many entries to show (1-20). Default: 5")
-    async def mylog(self, interaction: discord.Interaction, limit: int = 5):
-        limit = max(1, min(limit, 20))
-        rows = get_personal_updates(interaction.user.id, limit=limit)
-
+    async def _get_log_page(
+        self,
+        user_id: int,
+        title: str,
+        color: discord.Color,
+        page_size: int,
+        cursor: tuple[str, int] | None,
+        page: int,
+    ) -> tuple[discord.Embed | None, tuple[str, int] | None]:
+        """
+        Returns (embed, next_cursor) for one page, served from the page
+        cache when possible. embed is None when the logbook is empty.
+        """
+        key = (user_id, title, page_size, cursor)
+        cached = self.page_cache.get(key)
+        if cached is not None:
+            return cached
+
+        rows = await self.storage.get_personal_updates_page(user_id, limit=page_size + 1, before=cursor)
         if not rows:
-            await interaction.response.send_message(
-                "No logbook entries found yet. Post in the daily updates channel first.",
-                ephemeral=True
-            )
-            return
+            return None, None
 
-        embed = discord.Embed(
-            title="📓 Your Personal Logbook",
-            color=discord.Color.green()
-        )
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = (rows[-1]["log_date"], rows[-1]["id"])
+
+        embed = discord.Embed(title=title, color=color)
 
-        # Keep embed readable: add up to 10 fields, otherwise compress into description
-        for row in rows[:10]:
+        for row in rows:
             log_date = row["log_date"]
             content = row["content"]
             content = content if len(content) <= 900 else (content[:900] + "…")
             embed.add_field(name=log_date, value=content, inline=False)
 
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed.set_footer(text=f"Page {page}")
+
+        self.page_cache.put(key, (embed, next_cursor))
+        return embed, next_cursor
+
+    async def _send_log_pages(
+        self,
+        interaction: discord.Interaction,
+        user_id: int,
+        title: str,
+        color: discord.Color,
+        page_size: int,
+        empty_text: str,
+    ):
+        # Keep embed readable: at most 10 fields per page
+        page_size = max(1, min(page_size, 10))
+        embed, next_cursor = await self._get_log_page(user_id, title, color, page_size, None, page=1)
+
+        if embed is None:
+            await interaction.response.send_message(empty_text, ephemeral=True)
+            return
+
+        if next_cursor is None:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        view = LogbookPageView(self, interaction.user.id, user_id, title, color, page_size, next_cursor)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+    # ----------------------------
+    # Slash command: /mylog
+    # ----------------------------
+    @app_commands.command(name="mylog", description="Read your personal logbook entries.")
+    @app_commands.describe(limit="Entries per page (1-10). Default: 5")
+    async def mylog(self, interaction: discord.Interaction, limit: int = 5):
+        await self._send_log_pages(
+            interaction,
+            interaction.user.id,
+            title="📓 Your Personal Logbook",
+            color=discord.Color.green(),
+            page_size=limit,
+            empty_text="No logbook entries found yet. Post in the daily updates channel first."
+        )
 
     # ----------------------------
     # Slash command: /mylogday
@@ -135,7 +363,7 @@ class DailyPersonalUpdates(commands.Cog):
             )
             return
 
-        row = get_personal_update_by_date(interaction.user.id, date)
+        row = await self.storage.get_personal_update_by_date(interaction.user.id, date)
         if not row:
             await interaction.response.send_message(
                 f"No entry found for **{date}**.",
@@ -154,8 +382,8 @@ class DailyPersonalUpdates(commands.Cog):
     # ----------------------------
     # Optional moderator command: /userlog
     # ----------------------------
-    @app_commands.command(name="userlog", description="(Moderator) Read a member’s recent logbook entries.")
-    @app_commands.describe(member="Member to view", limit="How many entries to show (1-20). Default: 5")
+    @app_commands.command(name="userlog", description="(Moderator) Read a member’s logbook entries.")
+    @app_commands.describe(member="Member to view", limit="Entries per page (1-10). Default: 5")
     async def userlog(self, interaction: discord.Interaction, member: discord.Member, limit: int = 5):
         if not isinstance(interaction.user, discord.Member) or not _is_moderator(interaction.user):
             await interaction.response.send_message(
@@ -164,28 +392,129 @@ class DailyPersonalUpdates(commands.Cog):
             )
             return
 
-        limit = max(1, min(limit, 20))
-        rows = get_user_updates_for_mod_view(member.id, limit=limit)
+        await self._send_log_pages(
+            interaction,
+            member.id,
+            title=f"📓 Logbook — {member.display_name}",
+            color=discord.Color.orange(),
+            page_size=limit,
+            empty_text=f"No logbook entries found for {member.mention}."
+        )
+
+    # ----------------------------
+    # Slash commands: /searchlog and /usersearchlog
+    # ----------------------------
+    async def _send_search_results(
+        self,
+        interaction: discord.Interaction,
+        user_id: int,
+        query: str,
+        title: str,
+        color: discord.Color,
+        empty_text: str,
+    ):
+        query = (query or "").strip()
+        rows, cursor = await _search_page(self.storage, user_id, query, None)
 
         if not rows:
+            await interaction.response.send_message(empty_text, ephemeral=True)
+            return
+
+        embed = _search_embed(title, query, rows, color, page=1)
+
+        if cursor is None:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        view = LogSearchView(self.storage, interaction.user.id, user_id, query, title, color, cursor)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+    @app_commands.command(name="searchlog", description="Search your personal logbook.")
+    @app_commands.describe(query="Words to look for")
+    async def searchlog(self, interaction: discord.Interaction, query: str):
+        await self._send_search_results(
+            interaction,
+            interaction.user.id,
+            query,
+            title="🔎 Your Logbook Search",
+            color=discord.Color.green(),
+            empty_text="No logbook entries match that search."
+        )
+
+    @app_commands.command(name="usersearchlog", description="(Moderator) Search a member’s logbook.")
+    @app_commands.describe(member="Member to search", query="Words to look for")
+    async def usersearchlog(self, interaction: discord.Interaction, member: discord.Member, query: str):
+        if not isinstance(interaction.user, discord.Member) or not _is_moderator(interaction.user):
             await interaction.response.send_message(
-                f"No logbook entries found for {member.mention}.",
+                "You do not have permission to use this command.",
                 ephemeral=True
             )
             return
 
-        embed = discord.Embed(
-            title=f"📓 Logbook — {member.display_name}",
-            color=discord.Color.orange()
+        await self._send_search_results(
+            interaction,
+            member.id,
+            query,
+            title=f"🔎 Logbook Search — {member.display_name}",
+            color=discord.Color.orange(),
+            empty_text=f"No logbook entries for {member.mention} match that search."
         )
 
-        for row in rows[:10]:
-            log_date = row["log_date"]
-            content = row["content"]
-            content = content if len(content) <= 900 else (content[:900] + "…")
-            embed.add_field(name=log_date, value=content, inline=False)
+    # ----------------------------
+    # Slash command: /exportlog
+    # ----------------------------
+    @app_commands.command(name="exportlog", description="Download your full logbook as a compressed file.")
+    @app_commands.describe(
+        format="File format. Default: jsonl",
+        member="(Moderator) Export another member’s logbook"
+    )
+    async def exportlog(
+        self,
+        interaction: discord.Interaction,
+        format: Literal["jsonl", "csv"] = "jsonl",
+        member: discord.Member | None = None
+    ):
+        target = member or interaction.user
+
+        if target.id != interaction.user.id and (
+            not isinstance(interaction.user, discord.Member) or not _is_moderator(interaction.user)
+        ):
+            await interaction.response.send_message(
+                "You do not have permission to export another member’s logbook.",
+                ephemeral=True
+            )
+            return
 
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        fd, path = tempfile.mkstemp(suffix=".gz")
+        os.close(fd)
+
+        try:
+            count = await self.storage.export_personal_updates(target.id, path, format)
+
+            if count == 0:
+                await interaction.followup.send(
+                    f"No logbook entries found for {target.mention}.",
+                    ephemeral=True
+                )
+                return
+
+            limit = interaction.guild.filesize_limit if interaction.guild else 8 * 1024 * 1024
+            if os.path.getsize(path) > limit:
+                await interaction.followup.send(
+                    "The export is too large to upload here. Ask staff for an offline export.",
+                    ephemeral=True
+                )
+                return
+
+            await interaction.followup.send(
+                f"📦 Exported **{count}** logbook entries for {target.mention}.",
+                file=discord.File(path, filename=export_filename(target.id, format)),
+                ephemeral=True
+            )
+        finally:
+            os.remove(path)
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,42 @@
+# cogs/database_maintenance.py
+
+from discord.ext import commands, tasks
+
+from config import RETENTION_DAYS, RETENTION_INTERVAL_HOURS
+
+
+class DatabaseMaintenance(commands.Cog):
+    """
+    Background retention job:
+    - Purges expired rows per RETENTION_DAYS in small chunks
+    - Hands freed pages back to the filesystem (incremental vacuum)
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.storage = bot.storage
+
+    async def cog_load(self):
+        self._retention_task.start()
+
+    async def cog_unload(self):
+        self._retention_task.cancel()
+
+    @tasks.loop(hours=RETENTION_INTERVAL_HOURS)
+    async def _retention_task(self):
+        for table, days in RETENTION_DAYS.items():
+            deleted = await self.storage.purge_expired(table, days)
+            if deleted:
+                print(f"🧹 Purged {deleted} expired rows from {table}")
+
+        freed = await self.storage.compact()
+        if freed:
+            print(f"🧹 Released {freed} free database pages")
+
+    @_retention_task.error
+    async def _retention_task_error(self, error: Exception):
+        print(f"⚠️ Database retention failed: {error}")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(DatabaseMaintenance(bot))
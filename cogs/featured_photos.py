@@ -12,11 +12,6 @@ from config import (
     CHANNEL_FEATURED_PHOTOS,
 )
 
-from database import (
-    is_image_already_featured,
-    record_featured_photo,
-)
-
 IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
 FEATURED_INFO_TAG = "FEATURED_WEEKLY_INFO"
 
@@ -27,11 +22,12 @@ class FeaturedPhotos(commands.Cog):
     - Primary window: last 7 days
     - Fallback: last 30 days
     - Final fallback: whole channel
-    - Uses database to prevent duplicate features
+    - Uses storage to prevent duplicate features
     """
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.storage = bot.storage
 
     # --------------------------------------------------
     # Proper lifecycle handling (IMPORTANT)
@@ -123,6 +119,7 @@ class FeaturedPhotos(commands.Cog):
         self,
         channel: discord.TextChannel,
         days: int | None,
+        featured: set[str],
         max_messages: int = 5000,
     ) -> list[dict]:
 
@@ -142,7 +139,7 @@ class FeaturedPhotos(commands.Cog):
                 if (
                     att.content_type
                     and att.content_type.startswith("image/")
-                    and not is_image_already_featured(att.url)
+                    and att.url not in featured
                 ):
                     candidates.append(
                         {
@@ -163,7 +160,7 @@ class FeaturedPhotos(commands.Cog):
                 if (
                     img_url
                     and img_url.lower().endswith(IMAGE_EXTENSIONS)
-                    and not is_image_already_featured(img_url)
+                    and img_url not in featured
                 ):
                     candidates.append(
                         {
@@ -191,6 +188,9 @@ class FeaturedPhotos(commands.Cog):
 
         chosen = None
 
+        # Load the featured history once per run instead of once per image
+        featured = await self.storage.get_featured_image_urls()
+
         for window in windows:
             pool: list[dict] = []
 
@@ -200,7 +200,9 @@ class FeaturedPhotos(commands.Cog):
                     continue
 
                 pool.extend(
-                    await self._collect_image_candidates(channel, days=window)
+                    await self._collect_image_candidates(
+                        channel, days=window, featured=featured
+                    )
                 )
 
             if pool:
@@ -214,7 +216,7 @@ class FeaturedPhotos(commands.Cog):
             )
             return
 
-        record_featured_photo(
+        await self.storage.record_featured_photo(
             image_url=chosen["image_url"],
             channel_id=chosen["channel_id"],
             message_jump_url=chosen["jump_url"],
@@ -1,29 +1,220 @@
-import os
+import asyncio
+import hashlib
+from collections import Counter
+
 import discord
-from discord.ext import commands
-from nudenet import NudeDetector
+from discord.ext import commands, tasks
+
+from config import (
+    PROTECTED_IMAGE_CHANNELS,
+    NO_IMAGE_CHANNELS,
+    MODERATION_POOL,
+    MODERATION_WORKERS,
+    MODERATION_QUEUE_SIZE,
+    MODERATION_TIMEOUT,
+    MODERATION_BATCH_SIZE,
+    MODERATION_BATCH_WAIT_MS,
+    MODERATION_SCANS_PER_MESSAGE,
+    MODERATION_ANIMATION_FRAMES,
+    MODERATION_ENGINE,
+    MODERATION_SKIN_PREFILTER,
+    MODERATION_SKIN_MIN_RATIO,
+    MODERATION_SKIN_CALIBRATION,
+    MODERATION_CACHE_SIZE,
+    MODERATION_CACHE_TTL_DAYS,
+    MODERATION_STATS_INTERVAL_HOURS,
+    MODERATION_FRAME_SIZE,
+    NUDITY_THRESHOLD,
+)
+from image_pipeline import (
+    decode_image,
+    fetch_image,
+    needs_frame_sampling,
+    perceptual_hash,
+    prescreen,
+    sample_frames,
+    skin_ratio,
+)
+from moderation_engine import DetectorPool, ModerationBusy, VerdictCache
+
+RECHECK_MARGIN = 0.1  # near-misses on a resized variant are re-checked at full size
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif")
+ANIMATED_EXTENSIONS = (".gif", ".webp")
 
-from config import PROTECTED_IMAGE_CHANNELS, NO_IMAGE_CHANNELS
 
-TEMP_DIR = "/tmp/nudenet"
-NUDITY_THRESHOLD = 0.3
-IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+def _decode_and_hash(data: bytes):
+    frame = decode_image(data, MODERATION_FRAME_SIZE)
+    if frame is None:
+        return None, None, 0.0
+    return frame, perceptual_hash(frame), skin_ratio(frame)
+
+
+def _next_frame(frames):
+    frame = next(frames, None)
+    if frame is None:
+        return None
+    return frame, skin_ratio(frame)
 
 
 class ImageModeration(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.detector = NudeDetector()
-        os.makedirs(TEMP_DIR, exist_ok=True)
+        self.pool = DetectorPool(
+            workers=MODERATION_WORKERS,
+            mode=MODERATION_POOL,
+            queue_size=MODERATION_QUEUE_SIZE,
+            timeout=MODERATION_TIMEOUT,
+            max_batch=MODERATION_BATCH_SIZE,
+            max_wait_ms=MODERATION_BATCH_WAIT_MS,
+            engine=MODERATION_ENGINE,
+        )
+        self.cache = VerdictCache(
+            bot.storage,
+            maxsize=MODERATION_CACHE_SIZE,
+            ttl_days=MODERATION_CACHE_TTL_DAYS,
+        )
+        self.warmup_task: asyncio.Task | None = None
+
+        # How many images each tier settled (prefilter, cache, model)
+        self.tier_counts = Counter()
+
+    async def cog_load(self):
+        self.warmup_task = asyncio.create_task(self._warm_up())
+        self._stats_task.start()
+
+    async def _warm_up(self):
+        # Load the model only once the gateway is up, so it never delays login
+        await self.bot.wait_until_ready()
+        await self.pool.warm_up()
+
+    async def cog_unload(self):
+        if self.warmup_task:
+            self.warmup_task.cancel()
+        self._stats_task.cancel()
+        self.pool.close()
+
+    @tasks.loop(hours=MODERATION_STATS_INTERVAL_HOURS)
+    async def _stats_task(self):
+        stats = self.cache.stats()
+        if not stats["lookups"] and not self.tier_counts:
+            return
+
+        print(
+            f"📊 Verdict cache: {stats['hit_rate']:.0%} hit rate over {stats['lookups']} lookups "
+            f"(memory {stats['memory_hits']}, storage {stats['storage_hits']}, "
+            f"misses {stats['misses']}, errors {stats['errors']}, size {stats['size']}); "
+            f"tiers={dict(self.tier_counts)}"
+        )
+
+    async def nudity_score(self, image: bytes, use_cache: bool = True) -> float:
+        if await asyncio.to_thread(needs_frame_sampling, image):
+            return await self.animation_score(image, use_cache)
+
+        frame, phash, skin = await asyncio.to_thread(_decode_and_hash, image)
+        if frame is None:
+            return 0.0
+
+        # Tier 1: hardly any skin-coloured pixels, no need for the model
+        would_skip = MODERATION_SKIN_PREFILTER and skin < MODERATION_SKIN_MIN_RATIO
+        if would_skip and not MODERATION_SKIN_CALIBRATION:
+            self.tier_counts["prefilter"] += 1
+            return 0.0
+
+        # Tier 2: reposts of the same photo reuse the earlier verdict
+        score = await self.cache.get(phash) if use_cache else None
+
+        if score is None:
+            # Tier 3: NudeNet
+            detections = await self.pool.scan(frame)
+            print("NUDENET DETECTIONS:", detections)
+
+            score = max((item.get("score", 0) for item in detections), default=0.0)
+            self.cache.put(phash, score)
+            self.tier_counts["model"] += 1
+        else:
+            self.tier_counts["cache"] += 1
+
+        if would_skip:
+            self.tier_counts["calibration_skippable"] += 1
+            if score >= NUDITY_THRESHOLD:
+                self.tier_counts["calibration_missed"] += 1
+            print(
+                f"SKIN PREFILTER CALIBRATION: skin={skin:.3f} would skip, "
+                f"model score={score:.2f} ({'MISSED' if score >= NUDITY_THRESHOLD else 'ok'}) "
+                f"tiers={dict(self.tier_counts)}"
+            )
+
+        return score
+
+    async def animation_score(self, image: bytes, use_cache: bool = True) -> float:
+        """
+        Scans sampled frames one at a time and stops at the first flagged one.
+        """
+        # Keyed on the exact bytes: intros (black or title-card frames) are
+        # shared by unrelated animations, so a frame hash isn't enough.
+        digest = await asyncio.to_thread(lambda: hashlib.sha1(image).hexdigest())
+        key = f"anim:{digest}"
+
+        cached = await self.cache.get(key) if use_cache else None
+        if cached is not None:
+            self.tier_counts["cache"] += 1
+            return cached
+
+        frames = sample_frames(image, MODERATION_ANIMATION_FRAMES, MODERATION_FRAME_SIZE)
+        score = 0.0
+        scanned = False
 
-    def is_nude(self, image_path: str) -> bool:
-        detections = self.detector.detect(image_path)
-        print("NUDENET DETECTIONS:", detections)
+        while score < NUDITY_THRESHOLD:
+            sample = await asyncio.to_thread(_next_frame, frames)
+            if sample is None:
+                break
 
-        for item in detections:
-            if item.get("score", 0) >= NUDITY_THRESHOLD:
-                return True
-        return False
+            frame, skin = sample
+
+            if (
+                MODERATION_SKIN_PREFILTER
+                and skin < MODERATION_SKIN_MIN_RATIO
+                and not MODERATION_SKIN_CALIBRATION
+            ):
+                self.tier_counts["prefilter_frames"] += 1
+                continue
+
+            detections = await self.pool.scan(frame)
+            score = max(score, max((item.get("score", 0) for item in detections), default=0.0))
+            scanned = True
+            self.tier_counts["model_frames"] += 1
+
+        print(f"NUDENET ANIMATION: score={score:.2f} tiers={dict(self.tier_counts)}")
+
+        if scanned:
+            self.cache.put(key, score)
+        return score
+
+    async def is_nude(self, attachment: discord.Attachment) -> bool:
+        image, resized = await fetch_image(
+            self.bot.http_client,
+            attachment.url,
+            proxy_url=attachment.proxy_url,
+            width=attachment.width,
+            height=attachment.height,
+            # The media proxy may flatten animations when resizing
+            max_side=None if attachment.filename.lower().endswith(ANIMATED_EXTENSIONS) else MODERATION_FRAME_SIZE,
+        )
+        if image is None:
+            # Neither the proxy nor the CDN answered; treat it as a busy scan
+            raise asyncio.TimeoutError()
+
+        score = await self.nudity_score(image)
+
+        if resized and NUDITY_THRESHOLD - RECHECK_MARGIN <= score < NUDITY_THRESHOLD:
+            print(f"NUDENET RECHECK: score={score:.2f} on resized variant")
+            # Same perceptual hash as the variant, so skip the cached near-miss
+            original = await self.bot.http_client.get_image(attachment.url)
+            if original is None:
+                raise asyncio.TimeoutError()
+            score = await self.nudity_score(original, use_cache=False)
+
+        return score >= NUDITY_THRESHOLD
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -46,24 +237,61 @@ class ImageModeration(commands.Cog):
         if not message.attachments:
             return
 
-        for attachment in message.attachments:
-            if not attachment.filename.lower().endswith(IMAGE_EXTENSIONS):
-                continue
+        images = [
+            attachment for attachment in message.attachments
+            if attachment.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+
+        for attachment in images:
+            reason = prescreen(attachment.size, attachment.width, attachment.height)
+            if reason:
+                # Too big to check safely, so it does not stay up unchecked
+                await message.delete()
+                await message.channel.send(
+                    f"{message.author.mention} ❌ That image can't be checked ({reason}).",
+                    delete_after=10
+                )
+                return
+
+        # Fetch and scan every image at once, a few at a time
+        slots = asyncio.Semaphore(MODERATION_SCANS_PER_MESSAGE)
+        tasks = [asyncio.create_task(self._check(attachment, slots)) for attachment in images]
+        verdict = None
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    if await next_done:
+                        verdict = "nude"
+                        break
+                except (ModerationBusy, asyncio.TimeoutError):
+                    verdict = "busy"
+                    break
+        finally:
+            # One verdict settles the message; stop fetching and scanning the rest
+            for task in tasks:
+                task.cancel()
+
+        if verdict == "nude":
+            await message.delete()
+            await message.channel.send(
+                f"{message.author.mention} ❌ Images containing nudity are not allowed here.",
+                delete_after=10
+            )
+        elif verdict == "busy":
+            # Can't vouch for the image right now: remove it rather
+            # than let it through unchecked.
+            await message.delete()
+            await message.channel.send(
+                f"{message.author.mention} ⏳ Image checks are busy right now, please post it again in a moment.",
+                delete_after=10
+            )
+
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-            image_path = f"{TEMP_DIR}/{attachment.id}.jpg"
-            await attachment.save(image_path)
-
-            try:
-                if self.is_nude(image_path):
-                    await message.delete()
-                    await message.channel.send(
-                        f"{message.author.mention} ❌ Images containing nudity are not allowed here.",
-                        delete_after=10
-                    )
-                    return
-            finally:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
+    async def _check(self, attachment: discord.Attachment, slots: asyncio.Semaphore) -> bool:
+        async with slots:
+            return await self.is_nude(attachment)
 
 
 async def setup(bot: commands.Bot):
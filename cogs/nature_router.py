@@ -1,96 +1,79 @@
 # cogs/nature_router.py
 
-import os
-import cv2
-import numpy as np
-import aiohttp
+import asyncio
+import io
 import discord
 from discord.ext import commands
-from datetime import datetime, timezone
 
 from config import (
     CHANNEL_BARE_LIFE,
     CHANNEL_BARE_NATURE,
+    NATURE_ROUTING_POLICY,
+    NATURE_THRESHOLD,
 )
+from image_pipeline import prescreen
+from nature_scoring import score_image
 
-TEMP_DIR = "/tmp/nature_router"
 IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
-NATURE_THRESHOLD = 0.75
-HISTORY_SCAN_LIMIT = 100
+ROUTING_POLICIES = ("any", "majority", "all")
 
 
 class NatureRouter(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        os.makedirs(TEMP_DIR, exist_ok=True)
+        self.storage = bot.storage
 
-    # --------------------------------------------------
-    # Nature detection
-    # --------------------------------------------------
-
-    def _nature_score(self, image_path: str) -> float:
-        img = cv2.imread(image_path)
-        if img is None:
-            return 0.0
-
-        h, w, _ = img.shape
-        total = h * w
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-
-        green = cv2.inRange(hsv, (35, 40, 40), (85, 255, 255))
-        blue = cv2.inRange(hsv, (90, 30, 30), (135, 255, 255))
-
-        green_ratio = np.count_nonzero(green) / total
-        blue_ratio = np.count_nonzero(blue) / total
-
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-        edge_density = np.count_nonzero(edges) / total
-
-        score = (
-            min(green_ratio * 2.5, 0.5) +
-            min(blue_ratio * 2.0, 0.3) +
-            min(edge_density * 1.5, 0.2)
-        )
-
-        return min(score, 1.0)
+        if NATURE_ROUTING_POLICY not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown nature routing policy: {NATURE_ROUTING_POLICY}")
 
     # --------------------------------------------------
     # Helpers
     # --------------------------------------------------
 
-    async def _download(self, url: str, filename: str) -> str:
-        path = os.path.join(TEMP_DIR, filename)
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-        return path
-
-    async def _already_posted_today(
+    async def _claim_daily_slot(
         self,
         channel: discord.TextChannel,
         user: discord.Member,
     ) -> bool:
-        today = datetime.now(timezone.utc).date()
-
-        async for msg in channel.history(limit=HISTORY_SCAN_LIMIT):
-            if (
-                not msg.author.bot
-                and msg.author.id == user.id
-                and msg.attachments
-                and msg.created_at.date() == today
-            ):
-                return True
-
-        return False
+        """
+        Records today's post for the user in the target channel. Returns
+        False if they already have one there (the claim is atomic, so two
+        routed images can't both get through).
+        """
+        if await self.storage.has_posted_today(user.id, channel.id):
+            return False
+        return await self.storage.record_post(user.id, channel.id)
+
+    def _is_nature(self, scores: list[float]) -> bool:
+        """
+        Whether a message counts as nature, by NATURE_ROUTING_POLICY over
+        its images' scores.
+        """
+        votes = sum(score >= NATURE_THRESHOLD for score in scores)
+
+        if NATURE_ROUTING_POLICY == "any":
+            return votes > 0
+        if NATURE_ROUTING_POLICY == "all":
+            return votes == len(scores)
+        return votes * 2 > len(scores)
+
+    async def _fetch_images(self, images: list[discord.Attachment]) -> list[bytes] | None:
+        """
+        Downloads every image once, concurrently. None if any download fails.
+        """
+        buffers = await asyncio.gather(*(
+            self.bot.http_client.get_image(attachment.url) for attachment in images
+        ))
+        if any(data is None for data in buffers):
+            return None
+        return list(buffers)
 
     async def _repost(
         self,
         message: discord.Message,
         target: discord.TextChannel,
         score: float,
+        buffers: dict[int, bytes],
     ):
         embed = discord.Embed(
             description=message.content or "",
@@ -105,7 +88,21 @@ class NatureRouter(commands.Cog):
 
         embed.set_footer(text=f"Auto-routed • Nature score {score:.2f}")
 
-        files = [await a.to_file() for a in message.attachments]
+        # Images reuse the bytes already downloaded for scoring; anything
+        # else (video, audio) is fetched here for the first time.
+        files = []
+        for a in message.attachments:
+            data = buffers.get(a.id)
+            if data is None:
+                files.append(await a.to_file())
+            else:
+                files.append(discord.File(
+                    io.BytesIO(data),
+                    filename=a.filename,
+                    spoiler=a.is_spoiler(),
+                    description=a.description,
+                ))
+
         await target.send(embed=embed, files=files)
 
     # --------------------------------------------------
@@ -126,37 +123,51 @@ class NatureRouter(commands.Cog):
         if not message.attachments:
             return
 
-        att = message.attachments[0]
-        if not att.filename.lower().endswith(IMAGE_EXTENSIONS):
+        images = [
+            a for a in message.attachments
+            if a.filename.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        if not images:
+            return
+
+        if any(prescreen(a.size, a.width, a.height) for a in images):
+            return
+
+        # Originals, not proxy thumbnails: the same bytes are reposted
+        data = await self._fetch_images(images)
+        if data is None:
             return
 
-        img_path = await self._download(att.url, att.filename)
-        score = self._nature_score(img_path)
+        # Decoding and scoring stay off the event loop
+        scores = await asyncio.gather(*(asyncio.to_thread(score_image, d) for d in data))
+        nature = self._is_nature(scores)
+        score = sum(scores) / len(scores)
+        buffers = {a.id: d for a, d in zip(images, data)}
 
         # LIFE → NATURE
-        if message.channel.id == CHANNEL_BARE_LIFE and score >= NATURE_THRESHOLD:
+        if message.channel.id == CHANNEL_BARE_LIFE and nature:
             target = self.bot.get_channel(CHANNEL_BARE_NATURE)
             if not target:
                 return
 
-            if await self._already_posted_today(target, message.author):
+            if not await self._claim_daily_slot(target, message.author):
                 await message.delete()
                 return
 
-            await self._repost(message, target, score)
+            await self._repost(message, target, score, buffers)
             await message.delete()
 
         # NATURE → LIFE
-        elif message.channel.id == CHANNEL_BARE_NATURE and score < NATURE_THRESHOLD:
+        elif message.channel.id == CHANNEL_BARE_NATURE and not nature:
             target = self.bot.get_channel(CHANNEL_BARE_LIFE)
             if not target:
                 return
 
-            if await self._already_posted_today(target, message.author):
+            if not await self._claim_daily_slot(target, message.author):
                 await message.delete()
                 return
 
-            await self._repost(message, target, score)
+            await self._repost(message, target, score, buffers)
             await message.delete()
 
 
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from config import ROLE_MEMBER, CHANNEL_RULES
-from database import add_member, remove_member
 from datetime import datetime
 
 CHECKMARK = "✅"
@@ -10,6 +9,7 @@ CHECKMARK = "✅"
 class Rules(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.storage = bot.storage
         self.rules_message_id = None
 
     async def initialize_rules(self):
@@ -116,7 +116,7 @@ class Rules(commands.Cog):
 
         # Store in database
         now = datetime.utcnow().isoformat()
-        add_member(member.id, str(member), now)
+        await self.storage.add_member(member.id, str(member), now)
         print(f"🗄️ Stored in database: {member} at {now}")
 
     # ---------------------------------------
@@ -150,7 +150,7 @@ class Rules(commands.Cog):
         print(f"❌ Removed Member role from: {member}")
 
         # Remove from DB
-        remove_member(member.id)
+        await self.storage.remove_member(member.id)
         print(f"🗄️ Removed from database: {member.id}")
 
 
@@ -37,6 +37,52 @@ PROTECTED_IMAGE_CHANNELS = {
     CHANNEL_IDENTITY_PATH
 }
 
+NUDITY_THRESHOLD = 0.3           # NudeNet score at or above which an image is removed
+MODERATION_FRAME_SIZE = 640      # longest side handed to NudeNet (it infers at 320)
+
+# NudeNet worker pool
+MODERATION_POOL = "thread"       # "thread" or "process"
+MODERATION_WORKERS = 2
+MODERATION_QUEUE_SIZE = 8        # scans allowed to wait for a free worker
+MODERATION_TIMEOUT = 20          # seconds per scan
+# Batching is opt-in: it showed no throughput gain on CPU-only hosts (benchmarks/moderation_batching.py)
+MODERATION_BATCH_SIZE = 1        # images per batched inference call (1 = no batching)
+MODERATION_BATCH_WAIT_MS = 0     # how long a scan waits for others to batch with
+MODERATION_SCANS_PER_MESSAGE = 4 # attachments of one message scanned at once
+
+MODERATION_ANIMATION_FRAMES = 8  # frames sampled from a GIF / animated WebP
+
+# ONNX Runtime engine, per worker (keep workers x intra-op threads under the core count)
+MODERATION_ENGINE = {
+    "intra_op_threads": 1,
+    "inter_op_threads": 1,
+    "graph_optimization": "all",     # "disabled", "basic", "extended" or "all"
+    "execution_mode": "sequential",  # or "parallel"
+    "allow_spinning": False,         # spinning threads steal CPU from the event loop
+    "quantized": False,              # int8 copy of the model (needs the onnx package)
+}
+
+# Skin-colour prefilter: images below the ratio skip NudeNet.
+# Calibration mode still runs NudeNet on everything and logs what would have been skipped.
+MODERATION_SKIN_PREFILTER = True
+MODERATION_SKIN_MIN_RATIO = 0.02
+MODERATION_SKIN_CALIBRATION = False
+
+# Verdict cache (perceptual hash → detector score)
+MODERATION_CACHE_SIZE = 4096     # entries kept in memory (LRU)
+MODERATION_CACHE_TTL_DAYS = 30   # how long a verdict is trusted and stored
+MODERATION_STATS_INTERVAL_HOURS = 6  # how often cache hit rates and tier counts are logged
+
+# Attachment pre-screen (checked before anything is downloaded)
+IMAGE_MAX_BYTES = 25 * 1024 * 1024
+IMAGE_MAX_PIXELS = 64_000_000
+IMAGE_FETCH_TIMEOUT = 15         # seconds per download
+
+# Shared HTTP client for media downloads
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_PER_HOST = 8            # Discord's CDN and media proxy are separate hosts
+HTTP_CONNECT_TIMEOUT = 5
+
 # Channels where images are NEVER allowed
 NO_IMAGE_CHANNELS = {
     CHANNEL_RULES,
@@ -50,3 +96,18 @@ DAILY_IMAGE_CHANNELS = {
     CHANNEL_BARE_NATURE,
     CHANNEL_NUDITY_ART,
 }
+
+# ===== NATURE ROUTING =====
+NATURE_THRESHOLD = 0.75
+# How a multi-image post is judged: "any", "majority" or "all" images above NATURE_THRESHOLD
+NATURE_ROUTING_POLICY = "majority"
+
+# ===== DATABASE RETENTION =====
+# Days of history kept per table (0 = only today)
+RETENTION_DAYS = {
+    "daily_image_posts": 0,
+    "moderation_verdicts": MODERATION_CACHE_TTL_DAYS,
+}
+
+# How often the retention job runs
+RETENTION_INTERVAL_HOURS = 6
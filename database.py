@@ -1,47 +1,339 @@
+import asyncio
+import functools
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import date
+from datetime import date, timedelta
 
 DB_PATH = Path("bot_data.db")
 
+# Worker threads used for off-loop database access. Each worker keeps its
+# own long-lived connection; WAL mode lets readers run alongside a writer.
+DB_WORKERS = 4
+
+# Applied to every connection when it is opened.
+DB_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",      # ~16 MiB page cache
+    "PRAGMA mmap_size = 268435456",    # 256 MiB memory-mapped I/O
+)
+
+_local = threading.local()
+_connections: list[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
-def setup_database():
-    conn = get_connection()
-    c = conn.cursor()
+def _conn() -> sqlite3.Connection:
+    """
+    Returns the long-lived connection owned by the calling thread.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = get_connection()
+        _local.conn = conn
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=DB_WORKERS,
+            thread_name_prefix="db",
+        )
+    return _executor
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Runs a blocking database function on the database executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(),
+        functools.partial(func, *args, **kwargs)
+    )
+
+
+def close_database():
+    """
+    Stops the database executor and closes every pooled connection.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+    with _connections_lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+
+    _local.__dict__.clear()
+
+
+# ======================
+# Write-behind queue (group commit)
+# ======================
+
+# A batch is flushed when it reaches this many rows or when the oldest
+# pending write has waited this long, whichever comes first.
+WRITE_FLUSH_INTERVAL_MS = 50
+WRITE_BATCH_MAX_ROWS = 200
+
+
+def _apply_write_batch(batch: list[tuple[str, tuple, bool]]) -> list:
+    """
+    Applies a batch of (sql, params, want_rowcount) writes in one transaction.
+
+    Consecutive writes sharing a statement go through executemany unless a
+    caller asked for its own rowcount, in which case they run one by one
+    (still inside the same transaction, so the batch pays for one commit).
+    """
+    conn = _conn()
+    results: list = [None] * len(batch)
+
+    with conn:
+        i = 0
+        while i < len(batch):
+            sql = batch[i][0]
+            j = i
+            while j < len(batch) and batch[j][0] == sql:
+                j += 1
+
+            group = batch[i:j]
+            if any(want for _, _, want in group):
+                for offset, (_, params, _) in enumerate(group):
+                    results[i + offset] = conn.execute(sql, params).rowcount
+            else:
+                conn.executemany(sql, [params for _, params, _ in group])
+
+            i = j
+
+    return results
+
+
+def _apply_writes_one_by_one(batch: list[tuple[str, tuple, bool]]) -> list[tuple[bool, object]]:
+    """
+    Fallback after a failed batch: each write gets its own transaction, so
+    one bad write can't take the others down. Returns (ok, rowcount or
+    exception) per write.
+    """
+    conn = _conn()
+    outcomes: list[tuple[bool, object]] = []
+
+    for sql, params, want in batch:
+        try:
+            with conn:
+                rowcount = conn.execute(sql, params).rowcount
+            outcomes.append((True, rowcount if want else None))
+        except Exception as e:
+            outcomes.append((False, e))
 
-    # ======================
-    # Members
-    # ======================
-    c.execute("""
+    return outcomes
+
+
+class WriteQueue:
+    """
+    Single-writer actor that coalesces write intents into batched transactions.
+
+    submit() returns a future resolved with the statement's rowcount (or
+    None when the rowcount was not requested) once the batch has committed.
+    Once drain() has stopped the writer, submit() fails until start() is
+    called again.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = WRITE_FLUSH_INTERVAL_MS,
+        max_rows: int = WRITE_BATCH_MAX_ROWS,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+        # Counters
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def start(self):
+        self._closing = False
+        self._spawn()
+
+    def _spawn(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, sql: str, params: tuple, want_rowcount: bool = False) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+
+        if self._closing and (self._task is None or self._task.done()):
+            future.set_exception(RuntimeError("Write queue is closed"))
+            return future
+
+        self._spawn()
+        self._queue.put_nowait((sql, params, want_rowcount, future))
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            pending = [item]
+            deadline = loop.time() + self.flush_interval
+            stop = False
+
+            while len(pending) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                pending.append(item)
+
+            await self._flush(pending)
+
+            if stop:
+                break
+
+        # Intents submitted while drain() was waiting sit behind the sentinel
+        while not self._queue.empty():
+            late = []
+            while not self._queue.empty() and len(late) < self.max_rows:
+                item = self._queue.get_nowait()
+                if item is not None:
+                    late.append(item)
+            if late:
+                await self._flush(late)
+
+    async def _flush(self, pending: list):
+        batch = [(sql, params, want) for sql, params, want, _ in pending]
+        started = time.perf_counter()
+
+        try:
+            results = await run_db(_apply_write_batch, batch)
+        except Exception as e:
+            # The batch rolled back; replay it write by write so only the
+            # offending intents fail.
+            print(f"⚠️ Write batch of {len(batch)} failed ({e}), retrying one by one")
+            try:
+                outcomes = await run_db(_apply_writes_one_by_one, batch)
+            except Exception as e:
+                outcomes = [(False, e)] * len(batch)
+
+            for (*_, future), (ok, value) in zip(pending, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.rows += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_flush_ms = elapsed_ms
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+        for (*_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def drain(self):
+        """
+        Flushes everything queued so far, including intents submitted while
+        it waits, and stops the writer. Later submits are rejected.
+        """
+        self._closing = True
+        if self._task is None or self._task.done():
+            return
+
+        self._queue.put_nowait(None)
+        await self._task
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": self.total_flush_ms / self.batches if self.batches else 0.0,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+write_queue = WriteQueue()
+
+
+async def close_database_async():
+    """
+    Drains the write queue, then closes the database.
+    """
+    await write_queue.drain()
+    close_database()
+
+
+# ======================
+# Schema migrations
+# ======================
+
+# Applied in order at startup; PRAGMA user_version records how many have run.
+# Never edit a shipped migration, append a new one instead.
+MIGRATIONS: list[tuple[str, ...]] = [
+    # 1: initial schema (IF NOT EXISTS so pre-migration databases adopt it)
+    (
+        """
         CREATE TABLE IF NOT EXISTS members (
             user_id INTEGER PRIMARY KEY,
             username TEXT,
             accepted_at TEXT
         )
-    """)
-
-    # ======================
-    # Daily image posting limits
-    # ======================
-    c.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS daily_image_posts (
             user_id INTEGER NOT NULL,
             channel_id INTEGER NOT NULL,
             post_date TEXT NOT NULL,
             PRIMARY KEY (user_id, channel_id, post_date)
         )
-    """)
-
-    # ======================
-    # Daily personal updates (logbook)
-    # ======================
-    c.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS daily_personal_updates (
             user_id INTEGER NOT NULL,
             channel_id INTEGER NOT NULL,
@@ -51,12 +343,8 @@ def setup_database():
             created_at TEXT NOT NULL,
             PRIMARY KEY (user_id, channel_id, log_date)
         )
-    """)
-
-    # ======================
-    # ✅ NEW: Featured photos history
-    # ======================
-    c.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS featured_photos (
             image_url TEXT PRIMARY KEY,
             channel_id INTEGER NOT NULL,
@@ -64,130 +352,291 @@ def setup_database():
             author_id INTEGER,
             featured_at TEXT NOT NULL
         )
-    """)
+        """,
+    ),
+    # 2: indexes for the logbook, featured history and daily cleanup queries
+    (
+        """
+        CREATE INDEX IF NOT EXISTS idx_personal_updates_user_date
+        ON daily_personal_updates (user_id, log_date)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_featured_photos_featured_at
+        ON featured_photos (featured_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_daily_image_posts_post_date
+        ON daily_image_posts (post_date)
+        """,
+    ),
+    # 3: full-text index over the logbook, kept in sync by triggers
+    (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS daily_personal_updates_fts USING fts5(
+            content,
+            content='daily_personal_updates',
+            content_rowid='rowid'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS daily_personal_updates_fts_insert
+        AFTER INSERT ON daily_personal_updates BEGIN
+            INSERT INTO daily_personal_updates_fts (rowid, content)
+            VALUES (new.rowid, new.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS daily_personal_updates_fts_delete
+        AFTER DELETE ON daily_personal_updates BEGIN
+            INSERT INTO daily_personal_updates_fts (daily_personal_updates_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS daily_personal_updates_fts_update
+        AFTER UPDATE OF content ON daily_personal_updates BEGIN
+            INSERT INTO daily_personal_updates_fts (daily_personal_updates_fts, rowid, content)
+            VALUES ('delete', old.rowid, old.content);
+            INSERT INTO daily_personal_updates_fts (rowid, content)
+            VALUES (new.rowid, new.content);
+        END
+        """,
+        # Index the entries written before this migration
+        """
+        INSERT INTO daily_personal_updates_fts (daily_personal_updates_fts)
+        VALUES ('rebuild')
+        """,
+    ),
+    # 4: image moderation verdicts keyed by perceptual hash
+    (
+        """
+        CREATE TABLE IF NOT EXISTS moderation_verdicts (
+            phash TEXT PRIMARY KEY,
+            score REAL NOT NULL,
+            checked_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_moderation_verdicts_checked_at
+        ON moderation_verdicts (checked_at)
+        """,
+    ),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Applies pending migrations, each in its own transaction.
+    Returns the resulting schema version.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for number, statements in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
 
-    conn.commit()
-    conn.close()
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"🗄️ Applied database migration {number}")
+        version = number
+
+    return version
+
+
+def find_slow_query_plans(conn: sqlite3.Connection) -> dict[str, list[str]]:
+    """
+    Runs EXPLAIN QUERY PLAN over HOT_QUERIES and returns the plan steps
+    that scan a whole table or sort through a temporary b-tree.
+    """
+    problems: dict[str, list[str]] = {}
+
+    for name, (sql, params) in HOT_QUERIES.items():
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row["detail"]
+            full_scan = detail.startswith("SCAN") and "USING" not in detail
+            if full_scan or "TEMP B-TREE" in detail:
+                problems.setdefault(name, []).append(detail)
+
+    return problems
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection):
+    """
+    Switches the database to incremental auto-vacuum so space freed by
+    retention can be handed back to the filesystem a little at a time.
+    Existing databases need one full VACUUM for the switch to take effect.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+    # VACUUM may renumber implicit rowids, which the logbook FTS index uses
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'daily_personal_updates_fts'"
+    ).fetchone()
+    if has_fts:
+        with conn:
+            conn.execute(
+                "INSERT INTO daily_personal_updates_fts (daily_personal_updates_fts) VALUES ('rebuild')"
+            )
+
+
+def setup_database():
+    conn = _conn()
+    enable_incremental_vacuum(conn)
+    migrate(conn)
+
+    for name, details in find_slow_query_plans(conn).items():
+        print(f"⚠️ Query '{name}' is not index-backed: {'; '.join(details)}")
 
 
 # ======================
 # Members logic
 # ======================
 
-def add_member(user_id: int, username: str, accepted_at: str):
-    conn = get_connection()
-    c = conn.cursor()
+ADD_MEMBER_SQL = """
+    INSERT OR REPLACE INTO members (user_id, username, accepted_at)
+    VALUES (?, ?, ?)
+"""
 
-    c.execute("""
-        INSERT OR REPLACE INTO members (user_id, username, accepted_at)
-        VALUES (?, ?, ?)
-    """, (user_id, username, accepted_at))
+REMOVE_MEMBER_SQL = "DELETE FROM members WHERE user_id = ?"
 
-    conn.commit()
-    conn.close()
 
+def add_member(user_id: int, username: str, accepted_at: str):
+    conn = _conn()
+
+    with conn:
+        conn.execute(ADD_MEMBER_SQL, (user_id, username, accepted_at))
 
-def remove_member(user_id: int):
-    conn = get_connection()
-    c = conn.cursor()
 
-    c.execute("DELETE FROM members WHERE user_id = ?", (user_id,))
+def remove_member(user_id: int):
+    conn = _conn()
 
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(REMOVE_MEMBER_SQL, (user_id,))
 
 
 def get_all_members():
-    conn = get_connection()
-    c = conn.cursor()
+    c = _conn().cursor()
 
     c.execute("SELECT * FROM members")
-    rows = c.fetchall()
-
-    conn.close()
-    return rows
+    return c.fetchall()
 
 
 # ======================
 # Daily image logic
 # ======================
 
-def has_posted_today(user_id: int, channel_id: int) -> bool:
-    today = date.today().isoformat()
+HAS_POSTED_TODAY_SQL = """
+    SELECT 1 FROM daily_image_posts
+    WHERE user_id = ? AND channel_id = ? AND post_date = ?
+"""
 
-    conn = get_connection()
-    c = conn.cursor()
+RECORD_POST_SQL = """
+    INSERT OR IGNORE INTO daily_image_posts
+    (user_id, channel_id, post_date)
+    VALUES (?, ?, ?)
+"""
+
+CLEANUP_DAILY_POSTS_SQL = """
+    DELETE FROM daily_image_posts
+    WHERE post_date < ?
+"""
 
-    c.execute(
-        """
-        SELECT 1 FROM daily_image_posts
-        WHERE user_id = ? AND channel_id = ? AND post_date = ?
-        """,
-        (user_id, channel_id, today)
-    )
 
-    result = c.fetchone()
-    conn.close()
+def has_posted_today(user_id: int, channel_id: int) -> bool:
+    today = date.today().isoformat()
 
-    return result is not None
+    c = _conn().cursor()
+    c.execute(HAS_POSTED_TODAY_SQL, (user_id, channel_id, today))
 
+    return c.fetchone() is not None
 
-def record_post(user_id: int, channel_id: int):
-    today = date.today().isoformat()
 
-    conn = get_connection()
-    c = conn.cursor()
+def record_post(user_id: int, channel_id: int) -> bool:
+    """
+    Returns True if recorded, False if the user already posted today.
+    """
+    today = date.today().isoformat()
 
-    c.execute(
-        """
-        INSERT OR IGNORE INTO daily_image_posts
-        (user_id, channel_id, post_date)
-        VALUES (?, ?, ?)
-        """,
-        (user_id, channel_id, today)
-    )
+    conn = _conn()
+    with conn:
+        c = conn.execute(RECORD_POST_SQL, (user_id, channel_id, today))
 
-    conn.commit()
-    conn.close()
+    return c.rowcount == 1
 
 
 def cleanup_old_daily_posts():
     today = date.today().isoformat()
 
-    conn = get_connection()
-    c = conn.cursor()
-
-    c.execute(
-        """
-        DELETE FROM daily_image_posts
-        WHERE post_date < ?
-        """,
-        (today,)
-    )
-
-    conn.commit()
-    conn.close()
+    conn = _conn()
+    with conn:
+        conn.execute(CLEANUP_DAILY_POSTS_SQL, (today,))
 
 
 # ======================
 # Daily personal update (logbook) logic
 # ======================
 
+HAS_PERSONAL_UPDATE_TODAY_SQL = """
+    SELECT 1 FROM daily_personal_updates
+    WHERE user_id = ? AND channel_id = ? AND log_date = ?
+"""
+
+INSERT_PERSONAL_UPDATE_SQL = """
+    INSERT OR IGNORE INTO daily_personal_updates
+    (user_id, channel_id, message_id, log_date, content, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+GET_PERSONAL_UPDATES_SQL = """
+    SELECT log_date, content, created_at
+    FROM daily_personal_updates
+    WHERE user_id = ?
+    ORDER BY log_date DESC
+    LIMIT ?
+"""
+
+# Keyset pages, newest first. Cursor is the (log_date, id) of the last row shown.
+GET_PERSONAL_UPDATES_FIRST_PAGE_SQL = """
+    SELECT rowid AS id, log_date, content, created_at
+    FROM daily_personal_updates
+    WHERE user_id = ?
+    ORDER BY log_date DESC, rowid DESC
+    LIMIT ?
+"""
+
+GET_PERSONAL_UPDATES_PAGE_SQL = """
+    SELECT rowid AS id, log_date, content, created_at
+    FROM daily_personal_updates
+    WHERE user_id = ? AND (log_date, rowid) < (?, ?)
+    ORDER BY log_date DESC, rowid DESC
+    LIMIT ?
+"""
+
+GET_PERSONAL_UPDATE_BY_DATE_SQL = """
+    SELECT log_date, content, created_at
+    FROM daily_personal_updates
+    WHERE user_id = ? AND log_date = ?
+"""
+
+
 def has_personal_update_today(user_id: int, channel_id: int, log_date: str) -> bool:
-    conn = get_connection()
-    c = conn.cursor()
+    c = _conn().cursor()
 
-    c.execute(
-        """
-        SELECT 1 FROM daily_personal_updates
-        WHERE user_id = ? AND channel_id = ? AND log_date = ?
-        """,
-        (user_id, channel_id, log_date)
-    )
+    c.execute(HAS_PERSONAL_UPDATE_TODAY_SQL, (user_id, channel_id, log_date))
 
-    result = c.fetchone()
-    conn.close()
-    return result is not None
+    return c.fetchone() is not None
 
 
 def insert_personal_update(
@@ -201,85 +650,177 @@ def insert_personal_update(
     """
     Returns True if inserted, False if already exists.
     """
-    conn = get_connection()
-    c = conn.cursor()
+    conn = _conn()
 
-    c.execute(
-        """
-        INSERT OR IGNORE INTO daily_personal_updates
-        (user_id, channel_id, message_id, log_date, content, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (user_id, channel_id, message_id, log_date, content, created_at)
-    )
+    with conn:
+        c = conn.execute(
+            INSERT_PERSONAL_UPDATE_SQL,
+            (user_id, channel_id, message_id, log_date, content, created_at)
+        )
 
-    conn.commit()
-    inserted = (c.rowcount == 1)
-    conn.close()
-    return inserted
+    return c.rowcount == 1
 
 
 def get_personal_updates(user_id: int, limit: int = 10):
-    conn = get_connection()
-    c = conn.cursor()
+    c = _conn().cursor()
 
-    c.execute(
-        """
-        SELECT log_date, content, created_at
-        FROM daily_personal_updates
-        WHERE user_id = ?
-        ORDER BY log_date DESC
-        LIMIT ?
-        """,
-        (user_id, limit)
-    )
+    c.execute(GET_PERSONAL_UPDATES_SQL, (user_id, limit))
+
+    return c.fetchall()
+
+
+def get_personal_updates_page(
+    user_id: int,
+    limit: int = 10,
+    before: tuple[str, int] | None = None,
+):
+    """
+    Returns up to `limit` entries older than the `before` cursor
+    (newest first). Pass the (log_date, id) of the last row of a page
+    to get the next one.
+    """
+    c = _conn().cursor()
+
+    if before is None:
+        c.execute(GET_PERSONAL_UPDATES_FIRST_PAGE_SQL, (user_id, limit))
+    else:
+        c.execute(GET_PERSONAL_UPDATES_PAGE_SQL, (user_id, *before, limit))
+
+    return c.fetchall()
+
+
+ITER_PERSONAL_UPDATES_SQL = """
+    SELECT log_date, channel_id, message_id, content, created_at
+    FROM daily_personal_updates
+    WHERE user_id = ?
+    ORDER BY log_date, rowid
+"""
+
+
+def iter_personal_updates(user_id: int, chunk_size: int = 500):
+    """
+    Yields a member's entries oldest first, fetching `chunk_size` rows at a
+    time so memory stays flat however long the logbook is.
+
+    Uses its own cursor on the calling thread's connection; consume it on
+    one thread (e.g. inside run_db).
+    """
+    c = _conn().cursor()
+    c.execute(ITER_PERSONAL_UPDATES_SQL, (user_id,))
 
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    try:
+        while True:
+            rows = c.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        c.close()
 
 
 def get_personal_update_by_date(user_id: int, log_date: str):
-    conn = get_connection()
-    c = conn.cursor()
+    c = _conn().cursor()
 
-    c.execute(
-        """
-        SELECT log_date, content, created_at
-        FROM daily_personal_updates
-        WHERE user_id = ? AND log_date = ?
-        """,
-        (user_id, log_date)
-    )
+    c.execute(GET_PERSONAL_UPDATE_BY_DATE_SQL, (user_id, log_date))
 
-    row = c.fetchone()
-    conn.close()
-    return row
+    return c.fetchone()
 
 
 def get_user_updates_for_mod_view(user_id: int, limit: int = 10):
     return get_personal_updates(user_id, limit=limit)
 
 
+SEARCH_PERSONAL_UPDATES_SQL = """
+    SELECT
+        d.rowid AS id,
+        d.log_date,
+        snippet(daily_personal_updates_fts, 0, '**', '**', '…', 24) AS snippet,
+        daily_personal_updates_fts.rank AS rank
+    FROM daily_personal_updates_fts
+    JOIN daily_personal_updates AS d ON d.rowid = daily_personal_updates_fts.rowid
+    WHERE daily_personal_updates_fts MATCH ?
+      AND d.user_id = ?
+      AND (daily_personal_updates_fts.rank, d.rowid) > (?, ?)
+    ORDER BY daily_personal_updates_fts.rank, d.rowid
+    LIMIT ?
+"""
+
+
+def to_fts_query(text: str) -> str:
+    """
+    Turns free text into an FTS5 query matching every word, so user input
+    can never be parsed as FTS syntax.
+    """
+    return " ".join(
+        '"' + word.replace('"', '""') + '"'
+        for word in text.split()
+    )
+
+
+def search_personal_updates(
+    user_id: int,
+    query: str,
+    limit: int = 5,
+    after: tuple[float, int] | None = None,
+):
+    """
+    Ranked full-text search over one member's logbook.
+
+    Pass the (rank, id) of the last row of a page as `after` to get the
+    next page (keyset pagination, best matches first).
+    """
+    match = to_fts_query(query)
+    if not match:
+        return []
+
+    rank, row_id = after if after else (float("-inf"), 0)
+
+    c = _conn().cursor()
+    c.execute(SEARCH_PERSONAL_UPDATES_SQL, (match, user_id, rank, row_id, limit))
+    return c.fetchall()
+
+
 # ======================
 # ✅ Featured photos logic
 # ======================
 
+IS_IMAGE_FEATURED_SQL = """
+    SELECT 1 FROM featured_photos
+    WHERE image_url = ?
+"""
+
+GET_FEATURED_IMAGE_URLS_SQL = "SELECT image_url FROM featured_photos"
+
+RECORD_FEATURED_PHOTO_SQL = """
+    INSERT OR IGNORE INTO featured_photos
+    (image_url, channel_id, message_jump_url, author_id, featured_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+GET_FEATURED_HISTORY_SQL = """
+    SELECT image_url, channel_id, message_jump_url, author_id, featured_at
+    FROM featured_photos
+    ORDER BY featured_at DESC
+    LIMIT ?
+"""
+
+
 def is_image_already_featured(image_url: str) -> bool:
-    conn = get_connection()
-    c = conn.cursor()
+    c = _conn().cursor()
 
-    c.execute(
-        """
-        SELECT 1 FROM featured_photos
-        WHERE image_url = ?
-        """,
-        (image_url,)
-    )
+    c.execute(IS_IMAGE_FEATURED_SQL, (image_url,))
 
-    exists = c.fetchone() is not None
-    conn.close()
-    return exists
+    return c.fetchone() is not None
+
+
+def get_featured_image_urls() -> set[str]:
+    """
+    Returns every featured image URL, for bulk dedup in one query.
+    """
+    c = _conn().cursor()
+
+    c.execute(GET_FEATURED_IMAGE_URLS_SQL)
+    return {row["image_url"] for row in c.fetchall()}
 
 
 def record_featured_photo(
@@ -289,36 +830,276 @@ def record_featured_photo(
     author_id: int | None,
     featured_at: str,
 ):
-    conn = get_connection()
-    c = conn.cursor()
+    conn = _conn()
 
-    c.execute(
-        """
-        INSERT OR IGNORE INTO featured_photos
-        (image_url, channel_id, message_jump_url, author_id, featured_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (image_url, channel_id, message_jump_url, author_id, featured_at)
+    with conn:
+        conn.execute(
+            RECORD_FEATURED_PHOTO_SQL,
+            (image_url, channel_id, message_jump_url, author_id, featured_at)
+        )
+
+
+def get_featured_history(limit: int = 20):
+    c = _conn().cursor()
+
+    c.execute(GET_FEATURED_HISTORY_SQL, (limit,))
+
+    return c.fetchall()
+
+
+# ======================
+# Moderation verdict cache
+# ======================
+
+GET_MODERATION_VERDICT_SQL = """
+    SELECT score, checked_at FROM moderation_verdicts
+    WHERE phash = ?
+"""
+
+RECORD_MODERATION_VERDICT_SQL = """
+    INSERT OR REPLACE INTO moderation_verdicts (phash, score, checked_at)
+    VALUES (?, ?, ?)
+"""
+
+
+def get_moderation_verdict(phash: str):
+    c = _conn().cursor()
+
+    c.execute(GET_MODERATION_VERDICT_SQL, (phash,))
+
+    return c.fetchone()
+
+
+def record_moderation_verdict(phash: str, score: float, checked_at: str):
+    conn = _conn()
+
+    with conn:
+        conn.execute(RECORD_MODERATION_VERDICT_SQL, (phash, score, checked_at))
+
+
+# ======================
+# Retention
+# ======================
+
+# Date column each retention-managed table expires on (see RETENTION_DAYS)
+RETENTION_COLUMNS = {
+    "daily_image_posts": "post_date",
+    "moderation_verdicts": "checked_at",
+}
+
+# Rows deleted per transaction, so the write lock is only held briefly
+RETENTION_CHUNK_SIZE = 500
+
+# Free pages returned to the filesystem per maintenance run
+VACUUM_PAGES_PER_RUN = 2000
+
+
+def purge_expired_chunk(table: str, cutoff: str, chunk_size: int = RETENTION_CHUNK_SIZE) -> int:
+    """
+    Deletes up to `chunk_size` rows older than `cutoff` from a
+    retention-managed table. Returns the number of rows deleted.
+    """
+    column = RETENTION_COLUMNS[table]
+
+    conn = _conn()
+    with conn:
+        c = conn.execute(
+            f"""
+            DELETE FROM {table}
+            WHERE rowid IN (
+                SELECT rowid FROM {table}
+                WHERE {column} < ?
+                LIMIT ?
+            )
+            """,
+            (cutoff, chunk_size)
+        )
+
+    return c.rowcount
+
+
+def incremental_vacuum(max_pages: int = VACUUM_PAGES_PER_RUN) -> int:
+    """
+    Releases up to `max_pages` free pages. Returns how many were released.
+    """
+    conn = _conn()
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = min(free, max_pages)
+    if pages == 0:
+        return 0
+
+    # Each step of incremental_vacuum frees one page; the sqlite3 module
+    # only steps a pragma once per execute, so run it page by page.
+    conn.execute("BEGIN")
+    try:
+        for _ in range(pages):
+            conn.execute("PRAGMA incremental_vacuum(1)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return pages
+
+
+# ======================
+# Query plan checks
+# ======================
+
+# Queries on the message/interaction hot paths, with sample parameters.
+# Each must be answered from an index (see find_slow_query_plans).
+HOT_QUERIES: dict[str, tuple[str, tuple]] = {
+    "has_posted_today": (HAS_POSTED_TODAY_SQL, (0, 0, "")),
+    "cleanup_old_daily_posts": (CLEANUP_DAILY_POSTS_SQL, ("",)),
+    "has_personal_update_today": (HAS_PERSONAL_UPDATE_TODAY_SQL, (0, 0, "")),
+    "get_personal_updates": (GET_PERSONAL_UPDATES_SQL, (0, 10)),
+    "get_personal_updates_first_page": (GET_PERSONAL_UPDATES_FIRST_PAGE_SQL, (0, 10)),
+    "get_personal_updates_page": (GET_PERSONAL_UPDATES_PAGE_SQL, (0, "", 0, 10)),
+    "iter_personal_updates": (ITER_PERSONAL_UPDATES_SQL, (0,)),
+    "get_personal_update_by_date": (GET_PERSONAL_UPDATE_BY_DATE_SQL, (0, "")),
+    "is_image_already_featured": (IS_IMAGE_FEATURED_SQL, ("",)),
+    "get_featured_history": (GET_FEATURED_HISTORY_SQL, (20,)),
+    "get_moderation_verdict": (GET_MODERATION_VERDICT_SQL, ("",)),
+}
+
+
+# ======================
+# Async API (runs on the database executor)
+# ======================
+
+async def setup_database_async():
+    await run_db(setup_database)
+
+
+async def add_member_async(user_id: int, username: str, accepted_at: str):
+    await write_queue.submit(ADD_MEMBER_SQL, (user_id, username, accepted_at))
+
+
+async def remove_member_async(user_id: int):
+    await write_queue.submit(REMOVE_MEMBER_SQL, (user_id,))
+
+
+async def get_all_members_async():
+    return await run_db(get_all_members)
+
+
+async def has_posted_today_async(user_id: int, channel_id: int) -> bool:
+    return await run_db(has_posted_today, user_id, channel_id)
+
+
+async def record_post_async(user_id: int, channel_id: int) -> bool:
+    today = date.today().isoformat()
+    rowcount = await write_queue.submit(
+        RECORD_POST_SQL, (user_id, channel_id, today), want_rowcount=True
     )
+    return rowcount == 1
 
-    conn.commit()
-    conn.close()
 
+async def cleanup_old_daily_posts_async():
+    await run_db(cleanup_old_daily_posts)
 
-def get_featured_history(limit: int = 20):
-    conn = get_connection()
-    c = conn.cursor()
 
-    c.execute(
-        """
-        SELECT image_url, channel_id, message_jump_url, author_id, featured_at
-        FROM featured_photos
-        ORDER BY featured_at DESC
-        LIMIT ?
-        """,
-        (limit,)
+async def purge_expired_async(
+    table: str,
+    days: int,
+    chunk_size: int = RETENTION_CHUNK_SIZE,
+) -> int:
+    """
+    Deletes rows older than `days` days (0 keeps only today) chunk by chunk,
+    yielding to other database work between chunks.
+    """
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    total = 0
+
+    while True:
+        deleted = await run_db(purge_expired_chunk, table, cutoff, chunk_size)
+        total += deleted
+        if deleted < chunk_size:
+            return total
+        await asyncio.sleep(0)
+
+
+async def incremental_vacuum_async(max_pages: int = VACUUM_PAGES_PER_RUN) -> int:
+    return await run_db(incremental_vacuum, max_pages)
+
+
+async def has_personal_update_today_async(user_id: int, channel_id: int, log_date: str) -> bool:
+    return await run_db(has_personal_update_today, user_id, channel_id, log_date)
+
+
+async def insert_personal_update_async(
+    user_id: int,
+    channel_id: int,
+    message_id: int,
+    log_date: str,
+    content: str,
+    created_at: str
+) -> bool:
+    rowcount = await write_queue.submit(
+        INSERT_PERSONAL_UPDATE_SQL,
+        (user_id, channel_id, message_id, log_date, content, created_at),
+        want_rowcount=True
     )
+    return rowcount == 1
+
+
+async def get_personal_updates_async(user_id: int, limit: int = 10):
+    return await run_db(get_personal_updates, user_id, limit)
+
+
+async def get_personal_updates_page_async(
+    user_id: int,
+    limit: int = 10,
+    before: tuple[str, int] | None = None,
+):
+    return await run_db(get_personal_updates_page, user_id, limit, before)
+
+
+async def get_personal_update_by_date_async(user_id: int, log_date: str):
+    return await run_db(get_personal_update_by_date, user_id, log_date)
+
+
+async def get_user_updates_for_mod_view_async(user_id: int, limit: int = 10):
+    return await run_db(get_user_updates_for_mod_view, user_id, limit)
+
+
+async def search_personal_updates_async(
+    user_id: int,
+    query: str,
+    limit: int = 5,
+    after: tuple[float, int] | None = None,
+):
+    return await run_db(search_personal_updates, user_id, query, limit, after)
+
+
+async def is_image_already_featured_async(image_url: str) -> bool:
+    return await run_db(is_image_already_featured, image_url)
+
+
+async def get_featured_image_urls_async() -> set[str]:
+    return await run_db(get_featured_image_urls)
+
+
+async def record_featured_photo_async(
+    image_url: str,
+    channel_id: int,
+    message_jump_url: str,
+    author_id: int | None,
+    featured_at: str,
+):
+    await write_queue.submit(
+        RECORD_FEATURED_PHOTO_SQL,
+        (image_url, channel_id, message_jump_url, author_id, featured_at)
+    )
+
+
+async def get_featured_history_async(limit: int = 20):
+    return await run_db(get_featured_history, limit)
+
+
+async def get_moderation_verdict_async(phash: str):
+    return await run_db(get_moderation_verdict, phash)
+
 
-    rows = c.fetchall()
-    conn.close()
-    return rows
+async def record_moderation_verdict_async(phash: str, score: float, checked_at: str):
+    await write_queue.submit(RECORD_MODERATION_VERDICT_SQL, (phash, score, checked_at))
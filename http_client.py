@@ -0,0 +1,132 @@
+"""
+The bot's shared HTTP client for media downloads.
+
+The Bot owns one aiohttp session with a bounded connection pool (keep-alive,
+per-host caps, timeouts) and every cog that fetches media goes through it.
+Downloads are streamed with a byte cap and the first bytes are checked
+against image signatures, so oversized or non-image responses are dropped
+before they are buffered.
+"""
+
+import asyncio
+
+import aiohttp
+
+from config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_PER_HOST,
+    HTTP_CONNECT_TIMEOUT,
+    IMAGE_FETCH_TIMEOUT,
+    IMAGE_MAX_BYTES,
+)
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 12
+
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "jpeg",
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+}
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """
+    Image type from the leading magic bytes, or None if it isn't an image
+    format the bot decodes.
+    """
+    for signature, kind in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class HttpClient:
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_per_host: int = HTTP_MAX_PER_HOST,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        total_timeout: float = IMAGE_FETCH_TIMEOUT,
+    ):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout)
+        self.session: aiohttp.ClientSession | None = None
+
+        # Metrics
+        self.downloads = 0
+        self.rejected = 0
+        self.failed = 0
+        self.bytes_read = 0
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_per_host,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def _reject(self, url: str, reason: str) -> None:
+        self.rejected += 1
+        print(f"⚠️ Download rejected ({url}): {reason}")
+
+    async def get_image(self, url: str, max_bytes: int = IMAGE_MAX_BYTES) -> bytes | None:
+        """
+        Streams an image into memory. Returns None on a non-200 status, a
+        network error or timeout, a body over `max_bytes`, or content that
+        isn't an image.
+        """
+        try:
+            async with self.session.get(url) as resp:
+                if resp.status != 200:
+                    self.failed += 1
+                    print(f"⚠️ Download failed ({url}): HTTP {resp.status}")
+                    return None
+
+                if resp.content_length and resp.content_length > max_bytes:
+                    return self._reject(url, f"{resp.content_length} bytes")
+
+                buffer = bytearray()
+                sniffed = False
+
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    buffer += chunk
+                    self.bytes_read += len(chunk)
+
+                    if len(buffer) > max_bytes:
+                        return self._reject(url, f"over {max_bytes} bytes")
+
+                    if not sniffed and len(buffer) >= SNIFF_BYTES:
+                        if sniff_image_type(buffer) is None:
+                            return self._reject(url, "not an image")
+                        sniffed = True
+
+                if not sniffed and sniff_image_type(buffer) is None:
+                    return self._reject(url, "not an image")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.failed += 1
+            print(f"⚠️ Download failed ({url}): {e}")
+            return None
+
+        self.downloads += 1
+        return bytes(buffer)
+
+    def stats(self) -> dict:
+        return {
+            "downloads": self.downloads,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "bytes_read": self.bytes_read,
+        }
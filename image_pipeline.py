@@ -0,0 +1,237 @@
+"""
+In-memory image decoding shared by the moderation and routing cogs.
+Attachments are read into bytes and decoded straight to arrays, so nothing
+touches the filesystem on the hot path.
+
+Both detectors only need a few hundred pixels per side, so attachments are
+pre-screened on Discord's metadata, fetched as a resized variant from
+Discord's media proxy and decoded at reduced resolution into a bounded frame.
+"""
+
+import io
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from config import IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS
+
+if TYPE_CHECKING:
+    from http_client import HttpClient
+
+# cv2 decode flags by downscale factor (JPEG decodes natively at 1/2, 1/4, 1/8)
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def prescreen(size: int, width: int | None, height: int | None) -> str | None:
+    """
+    Checks an attachment's reported byte size and dimensions before it is
+    downloaded. Returns the reason it should not be processed, or None.
+    """
+    if size > IMAGE_MAX_BYTES:
+        return f"file is larger than {IMAGE_MAX_BYTES // (1024 * 1024)} MB"
+
+    if width and height and width * height > IMAGE_MAX_PIXELS:
+        return f"image is larger than {IMAGE_MAX_PIXELS // 1_000_000} megapixels"
+
+    return None
+
+
+def proxy_variant_url(proxy_url: str, width: int | None, height: int | None, max_side: int) -> str | None:
+    """
+    URL of a server-side resized variant whose longest side is `max_side`.
+    Returns None when the size is unknown or the original is already small.
+    """
+    if not width or not height or max(width, height) <= max_side:
+        return None
+
+    scale = max_side / max(width, height)
+    w = max(1, round(width * scale))
+    h = max(1, round(height * scale))
+
+    # Attachment proxy URLs are signed and already carry a query string
+    separator = "&" if "?" in proxy_url else "?"
+    return f"{proxy_url}{separator}width={w}&height={h}"
+
+
+async def fetch_image(
+    client: "HttpClient",
+    url: str,
+    proxy_url: str | None = None,
+    width: int | None = None,
+    height: int | None = None,
+    max_side: int | None = None,
+) -> tuple[bytes | None, bool]:
+    """
+    Downloads an image, preferring a variant resized to `max_side` by the
+    media proxy and falling back to the original at `url`.
+
+    Returns (data, resized); resized is False when the original was fetched.
+    """
+    variant = None
+    if proxy_url and max_side:
+        variant = proxy_variant_url(proxy_url, width, height, max_side)
+
+    if variant:
+        data = await client.get_image(variant)
+        if data:
+            return data, True
+
+    return await client.get_image(url), False
+
+
+def image_size(data: bytes) -> tuple[int, int] | None:
+    """
+    Reads (width, height) from the image header without decoding pixels.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def fit_within(img: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    Downscales an image so its longest side is at most `max_side`.
+    """
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return img
+
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def decode_image(data: bytes, max_side: int | None = None) -> np.ndarray | None:
+    """
+    Decodes encoded image bytes (JPEG, PNG, WebP, ...) to a BGR array.
+    Returns None when the bytes are not a decodable image.
+
+    With `max_side`, the image is decoded at the largest reduced resolution
+    that still covers `max_side` and then scaled down to fit within it.
+    """
+    if not data:
+        return None
+
+    flags = cv2.IMREAD_COLOR
+    size = image_size(data) if max_side else None
+
+    if size is not None:
+        if size[0] * size[1] > IMAGE_MAX_PIXELS:
+            return None
+
+        longest = max(size)
+        for factor, reduced in REDUCED_DECODE_FLAGS.items():
+            if longest // factor >= max_side:
+                flags = reduced
+                break
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(buffer, flags)
+
+    if img is not None and max_side:
+        img = fit_within(img, max_side)
+    return img
+
+
+def needs_frame_sampling(data: bytes) -> bool:
+    """
+    True for animated images (GIF, WebP, APNG) and for any GIF, which cv2
+    can't be relied on to decode; both go through sample_frames().
+    """
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return True
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return getattr(img, "is_animated", False)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return False
+
+
+def sample_frames(
+    data: bytes,
+    count: int,
+    max_side: int,
+    scene_change: float = 0.2,
+) -> Iterator[np.ndarray]:
+    """
+    Lazily yields up to `count` BGR frames of an animation, each fitted
+    within `max_side`: half spread uniformly over the animation, the rest
+    at scene changes (mean difference of a 16x16 colour thumbnail above
+    `scene_change`). Frames are decoded one at a time, so memory stays at
+    about one frame however long the animation is.
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        total = getattr(img, "n_frames", 1)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return
+
+    with img:
+        uniform_count = min(total, max(1, (count + 1) // 2))
+        uniform = set(np.linspace(0, total - 1, num=uniform_count).round().astype(int).tolist())
+        scene_budget = count - len(uniform)
+        previous = None
+
+        for index in range(total):
+            try:
+                img.seek(index)
+                rgb = img.convert("RGB")
+            except (OSError, EOFError, ValueError):
+                # Truncated animation: stop at the last good frame
+                return
+
+            thumb = np.asarray(rgb.resize((16, 16), Image.BILINEAR), dtype=np.float32)
+
+            sampled = index in uniform
+            if not sampled and scene_budget > 0 and previous is not None:
+                if np.abs(thumb - previous).mean() / 255 > scene_change:
+                    sampled = True
+                    scene_budget -= 1
+            previous = thumb
+
+            if sampled:
+                rgb.thumbnail((max_side, max_side))
+                yield cv2.cvtColor(np.asarray(rgb), cv2.COLOR_RGB2BGR)
+
+
+def skin_ratio(img: np.ndarray, max_side: int = 128) -> float:
+    """
+    Fraction of skin-coloured pixels on a small downscale, counting a pixel
+    when either the YCrCb or the HSV skin range matches (generous on purpose,
+    it decides what may skip the detector).
+
+    Near-grayscale images return 1.0: colour can't rule out skin there.
+    """
+    small = fit_within(img, max_side)
+
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    if hsv[..., 1].mean() < 20:
+        return 1.0
+
+    ycrcb = cv2.cvtColor(small, cv2.COLOR_BGR2YCrCb)
+    mask = cv2.inRange(ycrcb, (0, 133, 77), (255, 173, 127))
+    mask |= cv2.inRange(hsv, (0, 40, 60), (25, 255, 255))
+
+    return np.count_nonzero(mask) / mask.size
+
+
+def perceptual_hash(img: np.ndarray) -> str:
+    """
+    64-bit difference hash (dHash) as 16 hex characters. Built from a 9x8
+    grayscale downscale, so re-encodes and resizes of the same photo
+    usually hash identically.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return bits.tobytes().hex()
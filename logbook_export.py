@@ -0,0 +1,84 @@
+"""
+Logbook export: streams a member's daily personal updates into a
+gzip-compressed JSONL or CSV file.
+
+Used by the storage backends for /exportlog and runnable offline:
+
+    python logbook_export.py <user_id> [--format jsonl|csv] [--output PATH] [--db PATH]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+from pathlib import Path
+
+import database
+
+EXPORT_FORMATS = ("jsonl", "csv")
+EXPORT_FIELDS = ("log_date", "channel_id", "message_id", "content", "created_at")
+
+
+def export_filename(user_id: int, fmt: str) -> str:
+    return f"logbook-{user_id}.{fmt}.gz"
+
+
+def write_export(rows, fileobj, fmt: str) -> int:
+    """
+    Writes rows to a text file object one at a time. Returns the row count.
+    """
+    count = 0
+
+    if fmt == "csv":
+        writer = csv.writer(fileobj)
+        writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            writer.writerow([row[field] for field in EXPORT_FIELDS])
+            count += 1
+    elif fmt == "jsonl":
+        for row in rows:
+            fileobj.write(json.dumps({field: row[field] for field in EXPORT_FIELDS}, ensure_ascii=False))
+            fileobj.write("\n")
+            count += 1
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    return count
+
+
+def write_export_file(rows, path: str | Path, fmt: str) -> int:
+    """
+    Streams rows into a gzip file at `path`. Returns the row count.
+    """
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        return write_export(rows, f, fmt)
+
+
+def export_personal_updates(user_id: int, path: str | Path, fmt: str = "jsonl") -> int:
+    """
+    Streams a member's whole SQLite logbook into a gzip file at `path`.
+    Returns the number of entries written.
+    """
+    return write_export_file(database.iter_personal_updates(user_id), path, fmt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a member's logbook.")
+    parser.add_argument("user_id", type=int)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl")
+    parser.add_argument("--output", help="Output file (default: logbook-<user_id>.<format>.gz)")
+    parser.add_argument("--db", help=f"Database file (default: {database.DB_PATH})")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.DB_PATH = Path(args.db)
+
+    output = args.output or export_filename(args.user_id, args.format)
+    count = export_personal_updates(args.user_id, output, args.format)
+    database.close_database()
+
+    print(f"Exported {count} entries to {output}")
+
+
+if __name__ == "__main__":
+    main()
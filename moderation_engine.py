@@ -0,0 +1,502 @@
+"""
+NudeNet inference off the event loop.
+
+DetectorPool runs detections on a thread or process pool where every
+worker owns its own NudeDetector, with a bounded backlog, per-scan
+timeouts and optional micro-batching so bursts of uploads never stall
+the gateway. NudeNet (and onnxruntime) is only imported by the workers,
+and warm_up() loads the model in the background; scans that arrive
+before it is ready wait in the backlog. Each worker's ONNX Runtime session
+is built with the pool's engine settings, optionally on an int8 model.
+
+VerdictCache remembers detector scores by perceptual hash so reposts of
+the same photo skip inference.
+"""
+
+import asyncio
+import importlib.metadata
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from image_pipeline import decode_image
+from storage import Storage
+
+if TYPE_CHECKING:
+    from nudenet import NudeDetector
+
+_local = threading.local()
+
+# ONNX Runtime session settings; DetectorPool(engine=...) overrides any of them
+ENGINE_DEFAULTS = {
+    "intra_op_threads": 1,
+    "inter_op_threads": 1,
+    "graph_optimization": "all",
+    "execution_mode": "sequential",
+    "allow_spinning": False,
+    "quantized": False,
+}
+GRAPH_OPTIMIZATIONS = ("disabled", "basic", "extended", "all")
+EXECUTION_MODES = ("sequential", "parallel")
+
+# Input size of NudeNet's bundled 320n model
+INFERENCE_RESOLUTION = 320
+
+# build_detector fills in NudeDetector's attributes by hand, mirroring
+# NudeDetector.__init__ of this release line
+SUPPORTED_NUDENET = "3.4."
+
+# Where the int8 copy of the model is written on first use
+QUANTIZED_MODEL_PATH = Path("models") / "320n.int8.onnx"
+
+
+class ModerationBusy(Exception):
+    """
+    Raised when the scan backlog is full.
+    """
+
+
+def engine_settings(engine: dict | None = None) -> dict:
+    """
+    ENGINE_DEFAULTS with `engine` applied on top, validated.
+    """
+    settings = {**ENGINE_DEFAULTS, **(engine or {})}
+
+    unknown = set(settings) - set(ENGINE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown engine settings: {', '.join(sorted(unknown))}")
+    if settings["graph_optimization"] not in GRAPH_OPTIMIZATIONS:
+        raise ValueError(f"Unknown graph optimization level: {settings['graph_optimization']}")
+    if settings["execution_mode"] not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {settings['execution_mode']}")
+
+    return settings
+
+
+def model_path() -> Path:
+    """
+    The fp32 model shipped with NudeNet.
+    """
+    import nudenet
+
+    return Path(nudenet.__file__).parent / "320n.onnx"
+
+
+def quantized_model_path() -> Path:
+    """
+    Returns the int8 copy of NudeNet's model, quantizing it on first use.
+    Needs the `onnx` package.
+    """
+    if QUANTIZED_MODEL_PATH.exists():
+        return QUANTIZED_MODEL_PATH
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    QUANTIZED_MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    # Workers may race to build it; each writes its own file, last rename wins
+    partial = QUANTIZED_MODEL_PATH.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    quantize_dynamic(model_path(), partial, weight_type=QuantType.QUInt8)
+    os.replace(partial, QUANTIZED_MODEL_PATH)
+
+    print(f"✅ Quantized NudeNet model written to {QUANTIZED_MODEL_PATH}")
+    return QUANTIZED_MODEL_PATH
+
+
+def build_detector(engine: dict | None = None) -> "NudeDetector":
+    """
+    Builds a NudeDetector whose ONNX Runtime session uses the engine settings.
+    """
+    import onnxruntime as ort
+    from nudenet import NudeDetector
+
+    version = importlib.metadata.version("nudenet")
+    if not version.startswith(SUPPORTED_NUDENET):
+        raise RuntimeError(
+            f"NudeNet {version} is installed but build_detector only knows the "
+            f"internals of {SUPPORTED_NUDENET}x; pin nudenet or update build_detector"
+        )
+
+    settings = engine_settings(engine)
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = settings["intra_op_threads"]
+    options.inter_op_num_threads = settings["inter_op_threads"]
+    options.graph_optimization_level = {
+        "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[settings["graph_optimization"]]
+    options.execution_mode = {
+        "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+        "parallel": ort.ExecutionMode.ORT_PARALLEL,
+    }[settings["execution_mode"]]
+
+    # Spinning worker threads burn CPU that the event loop needs
+    spinning = "1" if settings["allow_spinning"] else "0"
+    options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+    options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+
+    model = quantized_model_path() if settings["quantized"] else model_path()
+
+    # NudeDetector.__init__ would build (and we'd discard) a default
+    # all-cores session, so fill in the attributes it sets ourselves
+    detector = NudeDetector.__new__(NudeDetector)
+    detector.onnx_session = ort.InferenceSession(
+        str(model),
+        sess_options=options,
+        providers=["CPUExecutionProvider"],
+    )
+    detector.input_name = detector.onnx_session.get_inputs()[0].name
+    detector.input_width = INFERENCE_RESOLUTION
+    detector.input_height = INFERENCE_RESOLUTION
+    return detector
+
+
+def _configure(engine: dict):
+    _local.engine = engine
+
+
+def _get_detector() -> "NudeDetector":
+    """
+    Returns the detector owned by the calling worker (thread or process).
+    """
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = build_detector(getattr(_local, "engine", None))
+        _local.detector = detector
+    return detector
+
+
+def _warm_up():
+    # A dummy inference also initialises ONNX Runtime's lazy allocations
+    _get_detector().detect(np.zeros((320, 320, 3), dtype=np.uint8))
+
+
+def _to_frame(image):
+    # Decode in the worker so the event loop only ever handles raw bytes
+    if isinstance(image, bytes):
+        return decode_image(image)
+    return image
+
+
+def _detect(image) -> list[dict]:
+    frame = _to_frame(image)
+    if frame is None:
+        return []
+
+    return _get_detector().detect(frame)
+
+
+def _detect_batch(images: list) -> list[list[dict]]:
+    """
+    Runs one batched ONNX call over every decodable image.
+    Undecodable images get an empty detection list.
+    """
+    frames = [_to_frame(image) for image in images]
+    valid = [frame for frame in frames if frame is not None]
+    if not valid:
+        return [[] for _ in images]
+
+    detections = iter(_get_detector().detect_batch(valid, batch_size=len(valid)))
+    return [next(detections) if frame is not None else [] for frame in frames]
+
+
+class DetectorPool:
+    """
+    Scans are micro-batched: images arriving within `max_wait_ms` of each
+    other (up to `max_batch`) go to a worker as one batched ONNX call, and
+    each caller gets its own result back. max_batch=1 scans one by one.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        mode: str = "thread",
+        queue_size: int = 8,
+        timeout: float = 20.0,
+        max_batch: int = 1,
+        max_wait_ms: int = 0,
+        engine: dict | None = None,
+    ):
+        self.engine = engine_settings(engine)
+
+        if mode == "process":
+            self.executor: Executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_configure,
+                initargs=(self.engine,),
+            )
+        elif mode == "thread":
+            self.executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="nudenet",
+                initializer=_configure,
+                initargs=(self.engine,),
+            )
+        else:
+            raise ValueError(f"Unknown detector pool mode: {mode}")
+
+        self.capacity = workers * max_batch + queue_size
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = 0
+        self.workers = workers
+
+        # Warm-up metrics
+        self.ready = asyncio.Event()
+        self.warmup_seconds: float | None = None
+        self.first_scan_seconds: float | None = None
+        self._warmup: asyncio.Task | None = None
+
+        self._batch: list[tuple[object, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    async def warm_up(self):
+        """
+        Loads the model on every worker and runs a dummy inference, then
+        releases any scans that queued up in the meantime.
+
+        The first call (or the first scan) starts the warm-up; later calls
+        wait for the same one. Cancelling a caller doesn't stop it.
+        """
+        if self._warmup is None:
+            self._warmup = asyncio.get_running_loop().create_task(self._load_workers())
+        await asyncio.shield(self._warmup)
+
+    async def _load_workers(self):
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(self.executor, _warm_up)
+                for _ in range(self.workers)
+            ))
+            self.warmup_seconds = time.perf_counter() - started
+            print(f"✅ NudeNet ready in {self.warmup_seconds:.2f}s")
+        except Exception as e:
+            # Scans will try to load the model themselves
+            print(f"⚠️ NudeNet warm-up failed: {e}")
+        finally:
+            self.ready.set()
+
+    async def scan(self, image) -> list[dict]:
+        """
+        Runs NudeNet on an image (encoded bytes or BGR array) in the pool.
+
+        Raises ModerationBusy when the backlog is full and
+        asyncio.TimeoutError when the scan takes longer than `timeout`
+        (not counting time spent waiting for warm-up).
+        """
+        if self.pending >= self.capacity:
+            raise ModerationBusy()
+
+        started = time.perf_counter()
+        self.pending += 1
+
+        if not self.ready.is_set():
+            try:
+                await self.warm_up()
+            except asyncio.CancelledError:
+                self.pending -= 1
+                raise
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((image, future))
+
+        if len(self._batch) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        result = await asyncio.wait_for(future, self.timeout)
+
+        if self.first_scan_seconds is None:
+            self.first_scan_seconds = time.perf_counter() - started
+            print(f"NUDENET FIRST SCAN: {self.first_scan_seconds:.2f}s")
+
+        return result
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._batch = self._batch, []
+
+        # Callers that gave up while waiting (timeout, or a sibling image of
+        # their message was flagged) don't need inference
+        live = [(image, future) for image, future in batch if not future.done()]
+        self.pending -= len(batch) - len(live)
+        batch = live
+        if not batch:
+            return
+
+        loop = asyncio.get_running_loop()
+        images = [image for image, _ in batch]
+
+        if len(images) == 1:
+            job = self.executor.submit(_detect, images[0])
+        else:
+            job = self.executor.submit(_detect_batch, images)
+
+        # Slots are released when the worker is really done, not when a
+        # caller gives up, so timed-out jobs still count against the backlog.
+        job.add_done_callback(lambda done: self._on_done(loop, done, batch))
+
+        for _, future in batch:
+            future.add_done_callback(lambda _: self._cancel_if_abandoned(job, batch))
+
+    @staticmethod
+    def _cancel_if_abandoned(job, batch: list):
+        # Drops a job that hasn't started yet once nobody waits for it;
+        # its slots are released through _resolve like any other job
+        if all(future.cancelled() for _, future in batch):
+            job.cancel()
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop, job, batch: list):
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._resolve, job, batch)
+
+    def _resolve(self, job, batch: list):
+        self.pending -= len(batch)
+
+        if job.cancelled():
+            for _, future in batch:
+                future.cancel()
+            return
+
+        error = job.exception()
+        if error is None:
+            results = job.result()
+            if len(batch) == 1:
+                results = [results]
+
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# dHashes of flat or black frames; unrelated images collide on these
+DEGENERATE_HASHES = {"0" * 16, "f" * 16}
+
+
+class VerdictCache:
+    """
+    In-memory LRU in front of the storage backend's moderation_verdicts
+    table. Values are the highest detector score seen for an image, so the
+    verdict follows NUDITY_THRESHOLD even if it changes later.
+
+    The cache never decides a verdict on its own: storage errors count as
+    misses, and writes happen in the background.
+    """
+
+    def __init__(self, storage: Storage, maxsize: int = 4096, ttl_days: int = 30):
+        self.storage = storage
+        self.maxsize = maxsize
+        self.ttl = timedelta(days=ttl_days)
+        self._entries: OrderedDict[str, tuple[float, datetime]] = OrderedDict()
+
+        # Metrics
+        self.memory_hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        self._writes: set[asyncio.Task] = set()
+
+    def _remember(self, phash: str, score: float, checked_at: datetime):
+        self._entries[phash] = (score, checked_at)
+        self._entries.move_to_end(phash)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, phash: str) -> float | None:
+        if phash in DEGENERATE_HASHES:
+            return None
+
+        now = datetime.now(timezone.utc)
+
+        entry = self._entries.get(phash)
+        if entry is not None:
+            score, checked_at = entry
+            if now - checked_at <= self.ttl:
+                self._entries.move_to_end(phash)
+                self.memory_hits += 1
+                return score
+            del self._entries[phash]
+
+        try:
+            row = await self.storage.get_moderation_verdict(phash)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Verdict cache lookup failed: {e}")
+            row = None
+
+        if row is not None:
+            checked_at = datetime.fromisoformat(row["checked_at"])
+            if now - checked_at <= self.ttl:
+                self._remember(phash, row["score"], checked_at)
+                self.storage_hits += 1
+                return row["score"]
+
+        self.misses += 1
+        return None
+
+    def put(self, phash: str, score: float):
+        """
+        Remembers a score now and persists it in the background, so the
+        verdict never waits on (or fails with) the storage write.
+        """
+        if phash in DEGENERATE_HASHES:
+            return
+
+        checked_at = datetime.now(timezone.utc)
+        self._remember(phash, score, checked_at)
+
+        task = asyncio.create_task(self._persist(phash, score, checked_at))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _persist(self, phash: str, score: float, checked_at: datetime):
+        try:
+            await self.storage.record_moderation_verdict(
+                phash, score, checked_at.isoformat(timespec="seconds")
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Verdict cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.storage_hits + self.misses
+        hits = self.memory_hits + self.storage_hits
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "storage_hits": self.storage_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,100 @@
+"""
+Nature score for the routing cog: how much of a photo is foliage, sky and
+natural texture, from 0.0 to 1.0.
+
+The score is computed on a small thumbnail. A single HSV pass classifies
+every pixel as green, blue or neither through hue lookup tables, and edge
+density comes from Canny on the same thumbnail. legacy_nature_score() is
+the original full-frame scorer, kept for regression checks
+(benchmarks/nature_scoring.py).
+
+Edge pixels along an outline grow with the image side while the pixel
+count grows with its area, so a thumbnail k times smaller reports a k times
+higher edge density. The thumbnail's density is divided back by k to stay
+comparable with the full-resolution scorer the weights were tuned on.
+"""
+
+import cv2
+import numpy as np
+
+from image_pipeline import decode_image, fit_within, image_size
+
+THUMBNAIL_SIZE = 384
+
+# OpenCV hue (0-179) → 0 neither, 1 green (35-85), 2 blue (90-135)
+_HUE_CLASS = np.zeros(256, dtype=np.uint8)
+_HUE_CLASS[35:86] = 1
+_HUE_CLASS[90:136] = 2
+
+# Minimum saturation and value for each hue to count
+_SV_FLOOR = np.zeros(256, dtype=np.uint8)
+_SV_FLOOR[35:86] = 40
+_SV_FLOOR[90:136] = 30
+
+
+def _combine(green_ratio: float, blue_ratio: float, edge_density: float) -> float:
+    score = (
+        min(green_ratio * 2.5, 0.5) +
+        min(blue_ratio * 2.0, 0.3) +
+        min(edge_density * 1.5, 0.2)
+    )
+    return float(min(score, 1.0))
+
+
+def nature_score(img: np.ndarray | None, source_side: int | None = None) -> float:
+    """
+    `source_side` is the longest side of the original image when `img` was
+    already decoded at a reduced size.
+    """
+    if img is None:
+        return 0.0
+
+    thumb = fit_within(img, THUMBNAIL_SIZE)
+    downscale = max(thumb.shape[:2]) / max(source_side or 0, *img.shape[:2])
+    total = thumb.shape[0] * thumb.shape[1]
+
+    hsv = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)
+    hue = hsv[..., 0]
+    floor = np.minimum(hsv[..., 1], hsv[..., 2])
+
+    # A pixel counts for its hue class when both S and V clear the class floor
+    classes = np.where(floor >= _SV_FLOOR[hue], _HUE_CLASS[hue], 0)
+    counts = np.bincount(classes.ravel(), minlength=3)
+
+    gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+
+    return _combine(
+        counts[1] / total,
+        counts[2] / total,
+        np.count_nonzero(edges) / total * downscale,
+    )
+
+
+def score_image(data: bytes) -> float:
+    """
+    Decodes straight to thumbnail size and scores. Meant for an executor.
+    """
+    size = image_size(data)
+    return nature_score(decode_image(data, THUMBNAIL_SIZE), max(size) if size else None)
+
+
+def legacy_nature_score(img: np.ndarray | None) -> float:
+    if img is None:
+        return 0.0
+
+    h, w, _ = img.shape
+    total = h * w
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+    green = cv2.inRange(hsv, (35, 40, 40), (85, 255, 255))
+    blue = cv2.inRange(hsv, (90, 30, 30), (135, 255, 255))
+
+    green_ratio = np.count_nonzero(green) / total
+    blue_ratio = np.count_nonzero(blue) / total
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+    edge_density = np.count_nonzero(edges) / total
+
+    return _combine(green_ratio, blue_ratio, edge_density)
@@ -0,0 +1,31 @@
+"""
+Helpers shared by the offline scripts (threshold_calibration.py and
+benchmarks/): finding sample images on disk and summarising latencies.
+"""
+
+from pathlib import Path
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+
+def find_images(directory: str | Path) -> list[Path]:
+    """
+    Every image file under `directory`, recursively, in a stable order.
+    """
+    return sorted(
+        path for path in Path(directory).rglob("*")
+        if path.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+def read_images(directory: str | Path, limit: int | None = None) -> list[bytes]:
+    """
+    Raw bytes of the images under `directory`, at most `limit` of them.
+    """
+    return [path.read_bytes() for path in find_images(directory)[:limit]]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
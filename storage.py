@@ -0,0 +1,402 @@
+"""
+Storage backends for the bot's data: members, daily image quotas, the
+personal logbook, the featured photo history and cached moderation verdicts.
+
+Cogs use `bot.storage` instead of importing database functions, so the
+backend is picked once at startup (STORAGE_BACKEND) and can be swapped for
+the in-memory one in load tests and benchmarks.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from pathlib import Path
+
+import database
+from logbook_export import write_export_file
+
+
+class Storage(ABC):
+    async def setup(self):
+        pass
+
+    async def close(self):
+        pass
+
+    # ======================
+    # Members
+    # ======================
+
+    @abstractmethod
+    async def add_member(self, user_id: int, username: str, accepted_at: str):
+        ...
+
+    @abstractmethod
+    async def remove_member(self, user_id: int):
+        ...
+
+    @abstractmethod
+    async def get_all_members(self) -> list:
+        ...
+
+    # ======================
+    # Daily image quotas
+    # ======================
+
+    @abstractmethod
+    async def has_posted_today(self, user_id: int, channel_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def record_post(self, user_id: int, channel_id: int) -> bool:
+        """
+        Returns True if recorded, False if the user already posted today.
+        """
+
+    # ======================
+    # Personal logbook
+    # ======================
+
+    @abstractmethod
+    async def has_personal_update_today(self, user_id: int, channel_id: int, log_date: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def insert_personal_update(
+        self,
+        user_id: int,
+        channel_id: int,
+        message_id: int,
+        log_date: str,
+        content: str,
+        created_at: str
+    ) -> bool:
+        """
+        Returns True if inserted, False if already exists.
+        """
+
+    @abstractmethod
+    async def get_personal_updates_page(
+        self,
+        user_id: int,
+        limit: int = 10,
+        before: tuple[str, int] | None = None,
+    ) -> list:
+        """
+        Newest-first page of (id, log_date, content, created_at) rows older
+        than the (log_date, id) cursor.
+        """
+
+    @abstractmethod
+    async def get_personal_update_by_date(self, user_id: int, log_date: str):
+        ...
+
+    @abstractmethod
+    async def search_personal_updates(
+        self,
+        user_id: int,
+        query: str,
+        limit: int = 5,
+        after: tuple[float, int] | None = None,
+    ) -> list:
+        """
+        Best-first page of (id, log_date, snippet, rank) rows after the
+        (rank, id) cursor.
+        """
+
+    @abstractmethod
+    async def export_personal_updates(self, user_id: int, path: str | Path, fmt: str) -> int:
+        """
+        Streams a member's whole logbook into a gzip file. Returns the row count.
+        """
+
+    # ======================
+    # Featured photos
+    # ======================
+
+    @abstractmethod
+    async def get_featured_image_urls(self) -> set[str]:
+        ...
+
+    @abstractmethod
+    async def record_featured_photo(
+        self,
+        image_url: str,
+        channel_id: int,
+        message_jump_url: str,
+        author_id: int | None,
+        featured_at: str,
+    ):
+        ...
+
+    @abstractmethod
+    async def get_featured_history(self, limit: int = 20) -> list:
+        ...
+
+    # ======================
+    # Moderation verdicts
+    # ======================
+
+    @abstractmethod
+    async def get_moderation_verdict(self, phash: str):
+        """
+        Returns the cached (score, checked_at) row for a perceptual hash, or None.
+        """
+
+    @abstractmethod
+    async def record_moderation_verdict(self, phash: str, score: float, checked_at: str):
+        ...
+
+    # ======================
+    # Maintenance
+    # ======================
+
+    @abstractmethod
+    async def purge_expired(self, table: str, days: int) -> int:
+        """
+        Deletes rows older than `days` days (0 keeps only today).
+        """
+
+    async def compact(self) -> int:
+        """
+        Releases free space back to the OS. Returns the amount released.
+        """
+        return 0
+
+
+class SQLiteStorage(Storage):
+    """
+    The production backend: database.py on a pooled WAL connection with
+    the write-behind queue.
+    """
+
+    def __init__(self, path: str | Path = database.DB_PATH):
+        database.DB_PATH = Path(path)
+
+    async def setup(self):
+        await database.setup_database_async()
+        database.write_queue.start()
+
+    async def close(self):
+        await database.close_database_async()
+
+    async def add_member(self, user_id, username, accepted_at):
+        await database.add_member_async(user_id, username, accepted_at)
+
+    async def remove_member(self, user_id):
+        await database.remove_member_async(user_id)
+
+    async def get_all_members(self):
+        return await database.get_all_members_async()
+
+    async def has_posted_today(self, user_id, channel_id):
+        return await database.has_posted_today_async(user_id, channel_id)
+
+    async def record_post(self, user_id, channel_id):
+        return await database.record_post_async(user_id, channel_id)
+
+    async def has_personal_update_today(self, user_id, channel_id, log_date):
+        return await database.has_personal_update_today_async(user_id, channel_id, log_date)
+
+    async def insert_personal_update(self, user_id, channel_id, message_id, log_date, content, created_at):
+        return await database.insert_personal_update_async(
+            user_id, channel_id, message_id, log_date, content, created_at
+        )
+
+    async def get_personal_updates_page(self, user_id, limit=10, before=None):
+        return await database.get_personal_updates_page_async(user_id, limit, before)
+
+    async def get_personal_update_by_date(self, user_id, log_date):
+        return await database.get_personal_update_by_date_async(user_id, log_date)
+
+    async def search_personal_updates(self, user_id, query, limit=5, after=None):
+        return await database.search_personal_updates_async(user_id, query, limit, after)
+
+    async def export_personal_updates(self, user_id, path, fmt):
+        return await database.run_db(
+            lambda: write_export_file(database.iter_personal_updates(user_id), path, fmt)
+        )
+
+    async def get_featured_image_urls(self):
+        return await database.get_featured_image_urls_async()
+
+    async def record_featured_photo(self, image_url, channel_id, message_jump_url, author_id, featured_at):
+        await database.record_featured_photo_async(
+            image_url, channel_id, message_jump_url, author_id, featured_at
+        )
+
+    async def get_featured_history(self, limit=20):
+        return await database.get_featured_history_async(limit)
+
+    async def get_moderation_verdict(self, phash):
+        return await database.get_moderation_verdict_async(phash)
+
+    async def record_moderation_verdict(self, phash, score, checked_at):
+        await database.record_moderation_verdict_async(phash, score, checked_at)
+
+    async def purge_expired(self, table, days):
+        return await database.purge_expired_async(table, days)
+
+    async def compact(self):
+        return await database.incremental_vacuum_async()
+
+
+class MemoryStorage(Storage):
+    """
+    Dict-backed storage with no disk I/O, for tests, load tests and
+    benchmarks. Rows are plain dicts keyed like the SQLite columns.
+    """
+
+    def __init__(self):
+        self.members: dict[int, dict] = {}
+        self.daily_posts: set[tuple[int, int, str]] = set()
+        self.updates: dict[tuple[int, int, str], dict] = {}
+        self.featured: dict[str, dict] = {}
+        self.verdicts: dict[str, dict] = {}
+        self._next_id = 1
+
+    async def add_member(self, user_id, username, accepted_at):
+        self.members[user_id] = {
+            "user_id": user_id,
+            "username": username,
+            "accepted_at": accepted_at,
+        }
+
+    async def remove_member(self, user_id):
+        self.members.pop(user_id, None)
+
+    async def get_all_members(self):
+        return list(self.members.values())
+
+    async def has_posted_today(self, user_id, channel_id):
+        return (user_id, channel_id, date.today().isoformat()) in self.daily_posts
+
+    async def record_post(self, user_id, channel_id):
+        key = (user_id, channel_id, date.today().isoformat())
+        if key in self.daily_posts:
+            return False
+        self.daily_posts.add(key)
+        return True
+
+    async def has_personal_update_today(self, user_id, channel_id, log_date):
+        return (user_id, channel_id, log_date) in self.updates
+
+    async def insert_personal_update(self, user_id, channel_id, message_id, log_date, content, created_at):
+        key = (user_id, channel_id, log_date)
+        if key in self.updates:
+            return False
+
+        self.updates[key] = {
+            "id": self._next_id,
+            "user_id": user_id,
+            "channel_id": channel_id,
+            "message_id": message_id,
+            "log_date": log_date,
+            "content": content,
+            "created_at": created_at,
+        }
+        self._next_id += 1
+        return True
+
+    def _user_updates(self, user_id: int) -> list[dict]:
+        return [row for row in self.updates.values() if row["user_id"] == user_id]
+
+    async def get_personal_updates_page(self, user_id, limit=10, before=None):
+        rows = sorted(
+            self._user_updates(user_id),
+            key=lambda row: (row["log_date"], row["id"]),
+            reverse=True
+        )
+        if before is not None:
+            rows = [row for row in rows if (row["log_date"], row["id"]) < before]
+        return rows[:limit]
+
+    async def get_personal_update_by_date(self, user_id, log_date):
+        for row in self._user_updates(user_id):
+            if row["log_date"] == log_date:
+                return row
+        return None
+
+    async def search_personal_updates(self, user_id, query, limit=5, after=None):
+        words = [word.lower() for word in query.split()]
+        if not words:
+            return []
+
+        pattern = re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+        hits = []
+
+        for row in self._user_updates(user_id):
+            content = row["content"].lower()
+            if not all(word in content for word in words):
+                continue
+
+            # More occurrences rank better, like bm25 (lower is better)
+            rank = -float(len(pattern.findall(row["content"])))
+            hits.append({
+                "id": row["id"],
+                "log_date": row["log_date"],
+                "snippet": pattern.sub(lambda m: f"**{m.group(0)}**", row["content"]),
+                "rank": rank,
+            })
+
+        hits.sort(key=lambda hit: (hit["rank"], hit["id"]))
+        if after is not None:
+            hits = [hit for hit in hits if (hit["rank"], hit["id"]) > after]
+        return hits[:limit]
+
+    async def export_personal_updates(self, user_id, path, fmt):
+        rows = sorted(self._user_updates(user_id), key=lambda row: (row["log_date"], row["id"]))
+        return write_export_file(rows, path, fmt)
+
+    async def get_featured_image_urls(self):
+        return set(self.featured)
+
+    async def record_featured_photo(self, image_url, channel_id, message_jump_url, author_id, featured_at):
+        self.featured.setdefault(image_url, {
+            "image_url": image_url,
+            "channel_id": channel_id,
+            "message_jump_url": message_jump_url,
+            "author_id": author_id,
+            "featured_at": featured_at,
+        })
+
+    async def get_featured_history(self, limit=20):
+        rows = sorted(self.featured.values(), key=lambda row: row["featured_at"], reverse=True)
+        return rows[:limit]
+
+    async def get_moderation_verdict(self, phash):
+        return self.verdicts.get(phash)
+
+    async def record_moderation_verdict(self, phash, score, checked_at):
+        self.verdicts[phash] = {"score": score, "checked_at": checked_at}
+
+    async def purge_expired(self, table, days):
+        cutoff = (date.today() - timedelta(days=days)).isoformat()
+
+        if table == "daily_image_posts":
+            expired = {key for key in self.daily_posts if key[2] < cutoff}
+            self.daily_posts -= expired
+            return len(expired)
+
+        if table == "moderation_verdicts":
+            expired = [key for key, row in self.verdicts.items() if row["checked_at"] < cutoff]
+            for key in expired:
+                del self.verdicts[key]
+            return len(expired)
+
+        raise KeyError(table)
+
+
+STORAGE_BACKENDS = {
+    "sqlite": SQLiteStorage,
+    "memory": MemoryStorage,
+}
+
+
+def create_storage(name: str) -> Storage:
+    try:
+        return STORAGE_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown storage backend '{name}'. Choose one of: {', '.join(STORAGE_BACKENDS)}"
+        ) from None
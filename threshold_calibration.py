@@ -0,0 +1,219 @@
+"""
+Offline threshold calibration for the nature router and the nudity check.
+
+Scores a labelled image directory with the same code the cogs use, on a
+multiprocessing pool, and prints precision/recall per threshold along with
+throughput and per-image latency:
+
+    python threshold_calibration.py nature DIR [--workers N] [--cache PATH] [--rescore]
+    python threshold_calibration.py nudity DIR [--workers N] [--cache PATH] [--rescore]
+
+DIR holds two sub-directories, `positive/` (nature photos, or images that
+should be removed) and `negative/`. Scores are kept in a JSON cache file
+(DIR/.scores-<kind>.json by default), so re-runs only score new or changed
+images.
+"""
+
+import argparse
+import json
+import multiprocessing
+import statistics
+import time
+from pathlib import Path
+
+from config import (
+    MODERATION_ANIMATION_FRAMES,
+    MODERATION_ENGINE,
+    MODERATION_FRAME_SIZE,
+    MODERATION_SKIN_MIN_RATIO,
+    NATURE_THRESHOLD,
+    NUDITY_THRESHOLD,
+)
+from image_pipeline import decode_image, needs_frame_sampling, sample_frames, skin_ratio
+from nature_scoring import score_image
+from sample_images import find_images, percentile
+
+LABELS = {"positive": True, "negative": False}
+THRESHOLDS = [round(0.05 * i, 2) for i in range(1, 20)]
+CURRENT_THRESHOLDS = {"nature": NATURE_THRESHOLD, "nudity": NUDITY_THRESHOLD}
+
+_detector = None
+
+
+# ======================
+# Scoring (worker processes)
+# ======================
+
+def _init_worker(kind: str):
+    global _detector
+    if kind == "nudity":
+        from moderation_engine import build_detector
+
+        _detector = build_detector(MODERATION_ENGINE)
+
+
+def _nudity_score(data: bytes) -> tuple[float, float]:
+    """
+    Highest NudeNet score and skin ratio, over sampled frames for animations.
+    """
+    if needs_frame_sampling(data):
+        frames = list(sample_frames(data, MODERATION_ANIMATION_FRAMES, MODERATION_FRAME_SIZE))
+    else:
+        frame = decode_image(data, MODERATION_FRAME_SIZE)
+        frames = [frame] if frame is not None else []
+
+    score = 0.0
+    skin = 0.0
+    for frame in frames:
+        detections = _detector.detect(frame)
+        score = max(score, max((item.get("score", 0) for item in detections), default=0.0))
+        skin = max(skin, skin_ratio(frame))
+    return score, skin
+
+
+def _score_file(task: tuple[str, str, str]) -> tuple[str, dict]:
+    kind, key, path = task
+    data = Path(path).read_bytes()
+
+    started = time.perf_counter()
+    if kind == "nature":
+        result = {"score": score_image(data)}
+    else:
+        score, skin = _nudity_score(data)
+        result = {"score": score, "skin": skin}
+    result["seconds"] = time.perf_counter() - started
+
+    return key, result
+
+
+# ======================
+# Dataset and cache
+# ======================
+
+def find_labelled_images(directory: Path) -> dict[str, tuple[Path, bool]]:
+    """
+    Maps cache keys (relative path, size and mtime) to (path, label).
+    """
+    images = {}
+    for label_dir, label in LABELS.items():
+        for path in find_images(directory / label_dir):
+            stat = path.stat()
+            key = f"{path.relative_to(directory).as_posix()}:{stat.st_size}:{stat.st_mtime_ns}"
+            images[key] = (path, label)
+    return images
+
+
+def load_cache(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cache(path: Path, cache: dict):
+    partial = path.with_suffix(".tmp")
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    partial.replace(path)
+
+
+# ======================
+# Reporting
+# ======================
+
+def print_timing(rows: list[dict], scored: int, elapsed: float, workers: int):
+    """
+    Throughput and per-image latency. Latency comes from the stored scoring
+    times, so a fully cached run still reports it; throughput is measured when
+    this run scored images and estimated from those times otherwise.
+    """
+    latencies = [row["seconds"] * 1000 for row in rows]
+    if scored:
+        throughput = f"{scored / elapsed:.1f} img/s this run"
+    else:
+        throughput = f"~{workers * 1000 / statistics.mean(latencies):.1f} img/s estimated from cache"
+    print(
+        f"{throughput}; per image p50 {statistics.median(latencies):.0f} ms, "
+        f"p90 {percentile(latencies, 90):.0f} ms, p99 {percentile(latencies, 99):.0f} ms"
+    )
+
+
+def precision_recall(results: list[tuple[float, bool]], threshold: float) -> dict:
+    tp = sum(score >= threshold and label for score, label in results)
+    fp = sum(score >= threshold and not label for score, label in results)
+    fn = sum(score < threshold and label for score, label in results)
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    return {"tp": tp, "fp": fp, "fn": fn, "precision": precision, "recall": recall, "f1": f1}
+
+
+def print_report(kind: str, scored: list[dict], labels: list[bool]):
+    results = [(row["score"], label) for row, label in zip(scored, labels)]
+    current = CURRENT_THRESHOLDS[kind]
+    thresholds = sorted(set(THRESHOLDS) | {current})
+
+    print(f"\n{'threshold':>9}  {'precision':>9}  {'recall':>6}  {'f1':>5}  {'tp':>5}  {'fp':>5}  {'fn':>5}")
+    for threshold in thresholds:
+        pr = precision_recall(results, threshold)
+        marker = "  ← current" if threshold == current else ""
+        print(
+            f"{threshold:>9.2f}  {pr['precision']:>9.3f}  {pr['recall']:>6.3f}  {pr['f1']:>5.3f}  "
+            f"{pr['tp']:>5}  {pr['fp']:>5}  {pr['fn']:>5}{marker}"
+        )
+
+    best = max(thresholds, key=lambda t: precision_recall(results, t)["f1"])
+    print(f"\nBest F1 at {best:.2f} (current {current:.2f})")
+
+    if kind == "nudity":
+        skipped = [label for row, label in zip(scored, labels) if row["skin"] < MODERATION_SKIN_MIN_RATIO]
+        print(
+            f"Skin prefilter (< {MODERATION_SKIN_MIN_RATIO}) would skip "
+            f"{sum(not label for label in skipped)} negatives and {sum(skipped)} positives"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate routing and moderation thresholds.")
+    parser.add_argument("kind", choices=sorted(CURRENT_THRESHOLDS))
+    parser.add_argument("directory", type=Path, help="Directory with positive/ and negative/ images")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--cache", type=Path, help="Score cache file (default: DIR/.scores-<kind>.json)")
+    parser.add_argument("--rescore", action="store_true", help="Ignore cached scores")
+    args = parser.parse_args(argv)
+
+    images = find_labelled_images(args.directory)
+    if not images:
+        parser.error(f"no images under {args.directory}/positive or {args.directory}/negative")
+
+    cache_path = args.cache or args.directory / f".scores-{args.kind}.json"
+    cache = {} if args.rescore else load_cache(cache_path)
+
+    # Drop entries for images that were removed or changed since the last run
+    cache = {key: result for key, result in cache.items() if key in images}
+    todo = [(args.kind, key, str(path)) for key, (path, _) in images.items() if key not in cache]
+
+    print(f"{len(images)} images, {len(images) - len(todo)} cached, {len(todo)} to score on {args.workers} workers")
+
+    elapsed = 0.0
+    if todo:
+        started = time.perf_counter()
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(args.kind,)) as pool:
+            for done, (key, result) in enumerate(pool.imap_unordered(_score_file, todo), start=1):
+                cache[key] = result
+                if done % 100 == 0:
+                    print(f"  {done}/{len(todo)}")
+                    save_cache(cache_path, cache)
+        elapsed = time.perf_counter() - started
+        save_cache(cache_path, cache)
+        print(f"Scored {len(todo)} images in {elapsed:.1f}s")
+
+    keys = list(images)
+    print_timing([cache[key] for key in keys], len(todo), elapsed, args.workers)
+    print_report(args.kind, [cache[key] for key in keys], [images[key][1] for key in keys])
+
+
+if __name__ == "__main__":
+    main()